@@ -0,0 +1,232 @@
+"""Drive N simulated accounts through ``Tapper`` cycles against the local mock API.
+
+    python -m bench.load --accounts 1000 --cycles 3 --latency 0.05 --error-rate 0.01
+
+With ``--replay`` the accounts are answered offline from an ``HTTP_RECORD_FILE`` recording
+instead, at the recorded speed or ``--speed`` times faster (0 - no delays).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from loguru import logger as loguru_logger
+
+from bot.utils import logger
+from bot.utils.profiler import profiler
+from bot.config import settings
+from bot.core.tapper import Tapper
+from bot.core.scheduler import Scheduler
+from bot.core.http_pool import HttpClientPool
+from bot.core.recorder import HttpRecorder
+from bot.core.replay import ReplayHttpPool
+from bot.core.state_store import StateStore
+from bot.core.quests import QuestCatalogue
+from bot.core.tg_clients import TgClientManager
+from bot.utils.launcher import make_tg_client
+from bot.core.rate_limit import rate_limiter
+from bench.mock_api import MockSnapsterApi
+
+
+class BenchTapper(Tapper):
+    def __init__(self, *args, api_url: str, cycles: int, cycle_interval: float, latencies: list[float], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.API_URL = api_url
+        self.cycles = cycles
+        self.cycle_interval = cycle_interval
+        self.cycles_done = 0
+        self.latencies = latencies
+
+    async def get_tg_web_data(self, proxy: str | None) -> str:
+        self.user_id = int(self.session_name.rsplit('_', 1)[1]) + 100_000
+        return f'query_id=bench&user={{"id":{self.user_id}}}&auth_date={int(time.time())}&hash=bench'
+
+    async def make_request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().make_request(*args, **kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    async def farm(self) -> dict[str, float]:
+        await super().farm()
+        self.cycles_done += 1
+
+        if self.cycles_done >= self.cycles:
+            return {}
+
+        return {'farm': time.time() + self.cycle_interval}
+
+
+async def monitor_loop_lag(samples: list[float], interval: float = 0.05) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - start - interval, 0))
+
+
+def get_peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 / 1024 if sys.platform == 'darwin' else peak_rss / 1024
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] if samples else 0
+        return {'p50': value, 'p95': value, 'p99': value, 'max': value}
+
+    cut_points = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50': cut_points[49], 'p95': cut_points[94], 'p99': cut_points[98], 'max': max(samples)}
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    settings.RATE_LIMIT = args.rate_limit
+    settings.STEP_DELAY = 0
+    settings.QUEST_DELAY = 0
+    settings.RETRY_BACKOFF = args.retry_backoff
+    rate_limiter.set_share(1)
+
+    replay = ReplayHttpPool(args.replay, speed=args.speed) if args.replay else None
+    mock_api = None
+    if replay is None:
+        mock_api = MockSnapsterApi(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                   rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after)
+        api_url = await mock_api.start()
+    else:
+        api_url = Tapper.API_URL
+    recorder = HttpRecorder(args.record) if args.record else None
+
+    latencies: list[float] = []
+    loop_lag: list[float] = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = StateStore(file_name=os.path.join(tmp_dir, "bench_state.db"))
+        await store.start()
+        http_pool = replay or HttpClientPool()
+        quest_catalogue = QuestCatalogue()
+        tg_clients = TgClientManager(make_tg_client)
+        scheduler = Scheduler(max_in_flight=args.max_in_flight)
+
+        for index in range(args.accounts):
+            tapper = BenchTapper(f"bench_{index}", tg_clients=tg_clients, http_pool=http_pool,
+                                 store=store, quest_catalogue=quest_catalogue, api_url=api_url, cycles=args.cycles,
+                                 cycle_interval=args.cycle_interval, latencies=latencies, recorder=recorder)
+            scheduler.add(tapper, 'login')
+
+        if args.profile:
+            profiler.start(args.profile)
+        monitor = asyncio.create_task(monitor_loop_lag(loop_lag))
+        started_at = time.perf_counter()
+        try:
+            await scheduler.run()
+        finally:
+            elapsed = time.perf_counter() - started_at
+            monitor.cancel()
+            profiler.stop()
+            await scheduler.close()
+            await http_pool.close()
+            await store.close()
+            if mock_api is not None:
+                await mock_api.close()
+            if recorder is not None:
+                recorder.close()
+
+    traffic = replay or mock_api
+    total_requests = sum(traffic.requests.values())
+    return {
+        'accounts': args.accounts,
+        'cycles': args.cycles,
+        'elapsed_sec': elapsed,
+        'requests': total_requests,
+        'requests_per_sec': total_requests / elapsed if elapsed else 0,
+        'latency_sec': percentiles(latencies),
+        'loop_lag_sec': percentiles(loop_lag),
+        'peak_rss_mb': get_peak_rss_mb(),
+        'statuses': {str(status): count for status, count in sorted(traffic.statuses.items(), key=str)},
+        'requests_by_endpoint': dict(sorted(traffic.requests.items())),
+        'scheduler': scheduler.summary(),
+    }
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    def compare(value: float, base_value: float | None) -> str:
+        if not base_value:
+            return ''
+        return f"  ({(value - base_value) / base_value * 100:+.1f}% vs baseline)"
+
+    baseline = baseline or {}
+    rows = [
+        ('Elapsed, s', results['elapsed_sec'], baseline.get('elapsed_sec')),
+        ('Requests', results['requests'], baseline.get('requests')),
+        ('Requests / s', results['requests_per_sec'], baseline.get('requests_per_sec')),
+    ]
+    for name in ('p50', 'p95', 'p99'):
+        rows.append((f"Latency {name}, ms", results['latency_sec'][name] * 1000,
+                     (baseline.get('latency_sec') or {}).get(name, 0) * 1000))
+    for name in ('p99', 'max'):
+        rows.append((f"Loop lag {name}, ms", results['loop_lag_sec'][name] * 1000,
+                     (baseline.get('loop_lag_sec') or {}).get(name, 0) * 1000))
+    if results['peak_rss_mb'] is not None:
+        rows.append(('Peak RSS, MB', results['peak_rss_mb'], baseline.get('peak_rss_mb')))
+
+    print(f"\n{results['accounts']} accounts x {results['cycles']} cycles")
+    for name, value, base_value in rows:
+        print(f"  {name:<18} {value:>12.2f}{compare(value, base_value)}")
+    print(f"  {'Statuses':<18} {results['statuses']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load benchmark of Tapper against a local mock API")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--cycles", type=int, default=2)
+    parser.add_argument("--cycle-interval", type=float, default=1, help="Delay between cycles of one account, sec")
+    parser.add_argument("--max-in-flight", type=int, default=settings.MAX_CONCURRENT_ACTIONS)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean mock API latency, sec")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Mock API latency jitter, sec")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After of injected 429s, sec")
+    parser.add_argument("--retry-backoff", type=float, default=0.1, help="Base retry backoff, sec")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Host-wide request rate limit, 0 - none")
+    parser.add_argument("--record", help="Record the API traffic to this .jsonl.gz file")
+    parser.add_argument("--replay", help="Answer from this .jsonl.gz recording instead of the mock API")
+    parser.add_argument("--speed", type=float, default=1, help="Replay speed-up factor, 0 - no delays")
+    parser.add_argument("--profile", metavar="DIR", help="Write step timings, a CPU profile and slow callbacks to DIR")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run")
+    args = parser.parse_args()
+
+    loguru_logger.remove()
+    loguru_logger.add(sys.stderr, level=args.log_level)
+
+    results = asyncio.run(run_benchmark(args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+        logger.info(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
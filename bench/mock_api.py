@@ -0,0 +1,105 @@
+import asyncio
+import random
+from collections import Counter
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+QUESTS = [
+    {'id': quest_id, 'title': f"Quest {quest_id}", 'bonusPoints': 1000 * quest_id}
+    for quest_id in range(1, 6)
+]
+
+
+class MockSnapsterApi:
+    """Local stand-in for the ``prod.snapster.bot/api`` endpoints used by ``Tapper``.
+
+    Every request waits ``latency`` (+/- ``jitter``) seconds, then fails with a 500 with
+    probability ``error_rate`` or with a 429 with probability ``rate_limit_rate``.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0,
+                 rate_limit_rate: float = 0, retry_after: float = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.points: dict[str, float] = {}
+        self._server: TestServer | None = None
+
+    @property
+    def url(self) -> str:
+        return str(self._server.make_url('/api'))
+
+    async def start(self) -> str:
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get('/api/user/getUserByTelegramId', self.get_user)
+        app.router.add_post('/api/user/claimMiningBonus', self.claim_mining)
+        app.router.add_post('/api/dailyQuest/startDailyBonusQuest', self.start_daily)
+        app.router.add_post('/api/dailyQuest/claimDailyQuestBonus', self.result)
+        app.router.add_get('/api/referral/calculateReferralPoints', self.get_ref_points)
+        app.router.add_post('/api/referral/claimReferralPoints', self.result)
+        app.router.add_get('/api/quest/getQuests', self.get_quests)
+        app.router.add_post('/api/quest/startQuest', self.result)
+        app.router.add_post('/api/quest/claimQuestBonus', self.result)
+
+        self._server = TestServer(app)
+        await self._server.start_server()
+        return self.url
+
+    async def close(self) -> None:
+        if self._server is not None:
+            await self._server.close()
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler) -> web.Response:
+        endpoint = request.path.removeprefix('/api/')
+        self.requests[endpoint] += 1
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, random.uniform(self.latency - self.jitter, self.latency + self.jitter)))
+
+        if not request.headers.get('Telegram-Data'):
+            response = web.json_response({'result': False, 'error': 'Unauthorized'}, status=401)
+        elif random.random() < self.rate_limit_rate:
+            response = web.json_response({'result': False}, status=429,
+                                         headers={'Retry-After': str(self.retry_after)})
+        elif random.random() < self.error_rate:
+            response = web.json_response({'result': False}, status=500)
+        else:
+            response = await handler(request)
+
+        self.statuses[response.status] += 1
+        return response
+
+    async def get_user(self, request: web.Request) -> web.Response:
+        telegram_id = request.query.get('telegramId', '0')
+        return web.json_response({'result': True, 'data': {
+            'telegramId': telegram_id,
+            'pointsCount': self.points.get(telegram_id, 0),
+            'dailyBonusStreakCount': 3,
+            'currentLeague': {'leagueId': 2, 'title': 'Bronze', 'miningSpeed': 10},
+        }})
+
+    async def claim_mining(self, request: web.Request) -> web.Response:
+        telegram_id = (await request.json())['telegramId']
+        self.points[telegram_id] = self.points.get(telegram_id, 0) + 50
+        return web.json_response({'result': True, 'data': {'pointsClaimed': 50}})
+
+    async def start_daily(self, request: web.Request) -> web.Response:
+        return web.json_response({'result': random.random() < 0.5})
+
+    async def get_ref_points(self, request: web.Request) -> web.Response:
+        return web.json_response({'result': True, 'data': {'pointsToClaim': random.choice([0, 0, 25])}})
+
+    async def get_quests(self, request: web.Request) -> web.Response:
+        return web.json_response({'result': True, 'data': QUESTS})
+
+    async def result(self, request: web.Request) -> web.Response:
+        await request.read()
+        return web.json_response({'result': True})
@@ -0,0 +1,146 @@
+"""Measure start-up of the bot for a large ``sessions/`` directory against the local mock API.
+
+    python -m bench.startup --sessions 5000 --wave-size 100 --wave-interval 1
+
+Reports the time to import the bot, discover sessions, schedule every account,
+send the first API request and get every account to its first request.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def create_sessions(directory: str, count: int) -> None:
+    os.makedirs(os.path.join(directory, "sessions"), exist_ok=True)
+    for index in range(count):
+        open(os.path.join(directory, "sessions", f"bench_{index}.session"), 'w').close()
+
+
+async def run_benchmark(args: argparse.Namespace, import_sec: float) -> dict:
+    from bot.config import settings
+    from bot.core.scheduler import Scheduler
+    from bot.core.http_pool import HttpClientPool
+    from bot.core.state_store import StateStore
+    from bot.core.quests import QuestCatalogue
+    from bot.core.tg_clients import TgClientManager
+    from bot.core.rate_limit import rate_limiter
+    from bot.utils.launcher import get_session_names, get_proxies, get_startup_delay, make_tg_client
+    from bench.load import BenchTapper
+    from bench.mock_api import MockSnapsterApi
+
+    settings.STARTUP_WAVE_SIZE = args.wave_size
+    settings.STARTUP_WAVE_INTERVAL = args.wave_interval
+    settings.RATE_LIMIT = 0
+    settings.STEP_DELAY = 0
+    settings.QUEST_DELAY = 0
+    rate_limiter.set_share(1)
+
+    first_requests: dict[str, float] = {}
+    all_running = asyncio.Event()
+
+    class StartupTapper(BenchTapper):
+        async def get_tg_web_data(self, proxy: str | None) -> str:
+            if args.build_clients:
+                self.tg_clients.factory(self.session_name)
+            return await super().get_tg_web_data(proxy)
+
+        async def make_request(self, *request_args, **kwargs):
+            if self.session_name not in first_requests:
+                first_requests[self.session_name] = time.perf_counter()
+                if len(first_requests) == args.sessions:
+                    all_running.set()
+            return await super().make_request(*request_args, **kwargs)
+
+    mock_api = MockSnapsterApi(latency=args.latency, jitter=0)
+    api_url = await mock_api.start()
+    started_at = time.perf_counter()
+
+    session_names = get_session_names()
+    proxies = get_proxies()
+    discovered_at = time.perf_counter()
+
+    store = StateStore()
+    await store.start()
+    http_pool = HttpClientPool()
+    quest_catalogue = QuestCatalogue()
+    tg_clients = TgClientManager(make_tg_client)
+    scheduler = Scheduler(max_in_flight=args.max_in_flight or settings.MAX_CONCURRENT_ACTIONS)
+
+    now = time.time()
+    for index, session_name in enumerate(session_names):
+        tapper = StartupTapper(session_name, tg_clients=tg_clients, http_pool=http_pool, store=store,
+                               quest_catalogue=quest_catalogue, api_url=api_url, cycles=1, cycle_interval=0,
+                               latencies=[])
+        scheduler.add(tapper, 'login', due=now + get_startup_delay(index))
+    scheduled_at = time.perf_counter()
+
+    runner = asyncio.create_task(scheduler.run())
+    try:
+        await asyncio.wait_for(all_running.wait(), timeout=args.timeout)
+    finally:
+        runner.cancel()
+        await scheduler.close()
+        await http_pool.close()
+        await store.close()
+        await mock_api.close()
+
+    return {
+        'sessions': len(session_names),
+        'proxies': len(proxies),
+        'wave_size': args.wave_size,
+        'wave_interval': args.wave_interval,
+        'import_sec': import_sec,
+        'discovery_sec': discovered_at - started_at,
+        'schedule_sec': scheduled_at - discovered_at,
+        'time_to_first_request_sec': min(first_requests.values()) - started_at,
+        'time_to_all_running_sec': max(first_requests.values()) - started_at,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Start-up benchmark of the bot against a local mock API")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--wave-size", type=int, default=100, help="Accounts started per wave, 0 - all at once")
+    parser.add_argument("--wave-interval", type=float, default=0.1, help="Delay between waves, sec")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="Default - MAX_CONCURRENT_ACTIONS")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock API latency, sec")
+    parser.add_argument("--build-clients", action="store_true",
+                        help="Create the Pyrogram client of every account on its first login")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+
+    import_started_at = time.perf_counter()
+    from loguru import logger as loguru_logger
+    import bot.utils.launcher
+    import_sec = time.perf_counter() - import_started_at
+
+    loguru_logger.remove()
+    loguru_logger.add(sys.stderr, level="WARNING")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        create_sessions(tmp_dir, args.sessions)
+        os.chdir(tmp_dir)
+        try:
+            results = asyncio.run(run_benchmark(args, import_sec))
+        finally:
+            os.chdir(cwd)
+
+    print(f"\n{results['sessions']} sessions, waves of {results['wave_size']} every {results['wave_interval']}s")
+    for key in ('import_sec', 'discovery_sec', 'schedule_sec', 'time_to_first_request_sec', 'time_to_all_running_sec'):
+        print(f"  {key.removesuffix('_sec').replace('_', ' ').capitalize():<22} {results[key]:>10.3f} s")
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,12 +8,84 @@ class Settings(BaseSettings):
     API_HASH: str
 
     REF_ID: str = ''
+    START_HISTORY_CHECK_LIMIT: int = 20
 
     AUTO_MINING: bool = True
     CLAIM_REF_POINTS: bool = True
     AUTO_QUEST: bool = True
+    QUEST_CATALOGUE_TTL: int = 3600
+    QUEST_MAX_ATTEMPTS: int = 3
+    QUEST_PARK_TIME: int = 86400
+
+    MAX_CONCURRENT_ACTIONS: int = 50
+    WORKER_SUMMARY_INTERVAL: int = 60
+    WORKER_RESTART_DELAY: int = 5
+    WORKER_SHUTDOWN_TIMEOUT: int = 30
+    SHUTDOWN_TIMEOUT: int = 20
+    STARTUP_WAVE_SIZE: int = 100
+    STARTUP_WAVE_INTERVAL: float = 1
+    SWEEP_CONCURRENCY: int = 100
+
+    METRICS_HOST: str = '0.0.0.0'
+
+    LOG_LEVEL: str = 'INFO'
+    LOG_FORMAT: str = 'text'
+    LOG_ASYNC: bool = True
+    LOG_AGGREGATE: bool = False
+    LOG_SUMMARY_INTERVAL: int = 60
+    LOG_SAMPLE_RATE: float = 0
+    METRICS_PORT: int = 0
+    ACCOUNT_CONCURRENCY: int = 3
+    STEP_DELAY: float = 0
+    QUEST_DELAY: float = 0.1
+    SKIP_DONE_STEPS: bool = True
+    REFS_CHECK_INTERVAL: int = 3600
+    MINING_CLAIM_THRESHOLD: int = 500
+    MIN_CYCLE_DELAY: int = 300
+    MAX_CYCLE_DELAY: int = 3600
+    CYCLE_TIMEOUT: int = 300
+
+    TG_WEB_DATA_TTL: int = 21600
+    AUTH_BACKOFF: int = 60
+    AUTH_BACKOFF_MAX: int = 3600
+    AUTH_MAX_FAILURES: int = 5
+    AUTH_QUARANTINE_TIME: int = 21600
+    TG_MAX_CONNECTIONS: int = 20
+    TG_MAX_CONNECTIONS_PER_DC: int = 10
+    TG_CLIENT_IDLE_TIMEOUT: int = 300
+    TG_TIMEOUT: int = 30
+    STATE_FLUSH_INTERVAL: int = 5
 
     USE_PROXY_FROM_FILE: bool = False
+    HOT_RELOAD: bool = True
+    RELOAD_POLL_INTERVAL: int = 10
+    PROXY_CHECK_TIMEOUT: float = 5
+    PROXY_CHECK_TTL: int = 600
+    PROXY_CHECK_CONCURRENCY: int = 20
+    PROXY_RECHECK_INTERVAL: int = 60
+    PROXY_MAX_FAILURES: int = 3
+    PROXY_MAX_SESSIONS: int = 0
+
+    HTTP_POOL_SIZE: int = 100
+    HTTP_KEEPALIVE: int = 30
+    HTTP_DNS_TTL: int = 300
+    HTTP_CONNECT_TIMEOUT: float = 10
+    HTTP_READ_TIMEOUT: float = 20
+    HTTP_TIMEOUT: float = 30
+    HTTP_RECORD_FILE: str = ''
+
+    LEASE_STORE: str = ''
+    LEASE_TTL: int = 60
+    LEASE_RENEW_INTERVAL: int = 15
+    NODE_ID: str = ''
+
+    RATE_LIMIT: float = 20
+    RATE_LIMIT_BURST: int = 40
+    PROXY_RATE_LIMIT: float = 0
+    PROXY_RATE_LIMIT_BURST: int = 5
+    REQUEST_RETRIES: int = 3
+    RETRY_BACKOFF: float = 1
+    RETRY_BACKOFF_MAX: float = 30
 
 
 settings = Settings()
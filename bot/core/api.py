@@ -0,0 +1,88 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+
+from bot.utils import metrics
+from .models import UserStats, Quest
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+class ApiError(Exception):
+    """The API answered with an error status once retries ran out."""
+
+    def __init__(self, endpoint: str, status: int):
+        super().__init__(f"{endpoint} returned HTTP {status}")
+        self.status = status
+
+
+class SnapsterApi:
+    """One method per ``prod.snapster.bot/api`` endpoint, returning decoded models.
+
+    ``request`` is the account's ``make_request``, so rate limiting, retries and
+    per-account headers still apply. Error responses raise ``ApiError`` instead of
+    being decoded, so callers never take an error body for an answer.
+    """
+
+    def __init__(self, request: Callable[..., Awaitable[aiohttp.ClientResponse]]):
+        self._request = request
+
+    async def _call(self, http_client: aiohttp.ClientSession, method: str, endpoint: str, **kwargs) -> dict[str, Any]:
+        response = await self._request(http_client, method, endpoint, **kwargs)
+        if response.status >= 400:
+            response.release()
+            raise ApiError(endpoint.split('?', 1)[0], response.status)
+
+        try:
+            body = await response.read()
+        except asyncio.TimeoutError:
+            # The read is bounded by the session's HTTP_READ_TIMEOUT / HTTP_TIMEOUT
+            metrics.timeouts_total.inc(kind='http')
+            raise
+        return loads(body) if body else {}
+
+    async def _call_result(self, http_client: aiohttp.ClientSession, endpoint: str, **payload) -> bool | None:
+        return (await self._call(http_client, 'POST', endpoint, json=payload)).get('result')
+
+    async def get_user_by_telegram_id(self, http_client: aiohttp.ClientSession, telegram_id: int) -> UserStats:
+        resp_json = await self._call(http_client, 'GET', f'user/getUserByTelegramId?telegramId={telegram_id}')
+        return UserStats.from_json(resp_json.get('data'))
+
+    async def start_daily_bonus_quest(self, http_client: aiohttp.ClientSession, telegram_id: int) -> bool | None:
+        return await self._call_result(http_client, 'dailyQuest/startDailyBonusQuest', telegramId=str(telegram_id))
+
+    async def claim_daily_quest_bonus(self, http_client: aiohttp.ClientSession, telegram_id: int,
+                                      day_count: int) -> bool | None:
+        return await self._call_result(http_client, 'dailyQuest/claimDailyQuestBonus',
+                                       telegramId=str(telegram_id), dayCount=day_count)
+
+    async def claim_mining_bonus(self, http_client: aiohttp.ClientSession, telegram_id: int) -> float:
+        resp_json = await self._call(http_client, 'POST', 'user/claimMiningBonus',
+                                     json={'telegramId': str(telegram_id)})
+        return (resp_json.get('data') or {}).get('pointsClaimed') or 0
+
+    async def calculate_referral_points(self, http_client: aiohttp.ClientSession, telegram_id: int) -> float:
+        resp_json = await self._call(http_client, 'GET', f'referral/calculateReferralPoints?telegramId={telegram_id}')
+        return (resp_json.get('data') or {}).get('pointsToClaim') or 0
+
+    async def claim_referral_points(self, http_client: aiohttp.ClientSession, telegram_id: int) -> bool | None:
+        return await self._call_result(http_client, 'referral/claimReferralPoints', telegramId=str(telegram_id))
+
+    async def get_quests(self, http_client: aiohttp.ClientSession, telegram_id: int) -> list[Quest]:
+        resp_json = await self._call(http_client, 'GET', f'quest/getQuests?telegramId={telegram_id}')
+        return [Quest.from_json(quest) for quest in resp_json.get('data') or []]
+
+    async def start_quest(self, http_client: aiohttp.ClientSession, telegram_id: int, quest_id: int) -> bool | None:
+        return await self._call_result(http_client, 'quest/startQuest',
+                                       telegramId=str(telegram_id), questId=quest_id)
+
+    async def claim_quest_bonus(self, http_client: aiohttp.ClientSession, telegram_id: int,
+                                quest_id: int) -> bool | None:
+        return await self._call_result(http_client, 'quest/claimQuestBonus',
+                                       telegramId=str(telegram_id), questId=quest_id)
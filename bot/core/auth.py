@@ -0,0 +1,93 @@
+import random
+import time
+from enum import Enum
+
+from bot.config import settings
+from bot.utils import logger, metrics
+
+
+class AuthState(str, Enum):
+    UNAUTHENTICATED = 'unauthenticated'
+    AUTHENTICATING = 'authenticating'
+    ACTIVE = 'active'
+    BACKING_OFF = 'backing_off'
+    QUARANTINED = 'quarantined'
+
+
+class AuthLifecycle:
+    """Authorization state of one account.
+
+    Failed logins are retried with exponential backoff from ``AUTH_BACKOFF`` up to
+    ``AUTH_BACKOFF_MAX`` sec. After ``AUTH_MAX_FAILURES`` failures in a row the account is
+    quarantined for ``AUTH_QUARANTINE_TIME`` sec and then gets one trial login. Web app data
+    rejected by the API before it was accepted even once counts as a failed login, so an
+    account the API keeps refusing does not loop through Telegram.
+    """
+
+    def __init__(self, session_name: str):
+        self.session_name = session_name
+        self.state = AuthState.UNAUTHENTICATED
+        self.failures = 0
+        self.confirmed = False
+        metrics.auth_states.inc(state=self.state.value)
+
+    def _set_state(self, state: AuthState) -> None:
+        if state is not self.state:
+            metrics.auth_states.dec(state=self.state.value)
+            metrics.auth_states.inc(state=state.value)
+            self.state = state
+
+    def get_backoff_delay(self) -> float:
+        delay = min(settings.AUTH_BACKOFF_MAX, settings.AUTH_BACKOFF * 2 ** (self.failures - 1))
+        return random.uniform(delay / 2, delay)
+
+    def begin(self) -> None:
+        if self.state is AuthState.QUARANTINED:
+            logger.info(f"{self.session_name} | Quarantine is over, trying to log in again")
+        self._set_state(AuthState.AUTHENTICATING)
+
+    def succeed(self, fresh: bool) -> None:
+        """Logged in; data fresh from Telegram is confirmed by the first accepted request."""
+        self.confirmed = not fresh
+        self._set_state(AuthState.ACTIVE)
+
+    def confirm(self) -> None:
+        """The API accepted the web app data."""
+        self.confirmed = True
+        self.failures = 0
+
+    def expire(self) -> None:
+        self._set_state(AuthState.UNAUTHENTICATED)
+
+    def reject(self) -> float:
+        """Web app data was rejected by the API; returns when to log in again."""
+        if self.confirmed:
+            self.confirmed = False
+            self._set_state(AuthState.UNAUTHENTICATED)
+            return time.time()
+
+        return self.fail("web app data rejected")
+
+    def fail(self, reason: str) -> float:
+        """Login failed; returns when to try again."""
+        self.failures += 1
+
+        if self.failures >= settings.AUTH_MAX_FAILURES:
+            self._set_state(AuthState.QUARANTINED)
+            logger.error(f"{self.session_name} | Authorization failed {self.failures} times in a row ({reason}), "
+                         f"quarantined for {settings.AUTH_QUARANTINE_TIME}s")
+            return time.time() + settings.AUTH_QUARANTINE_TIME
+
+        delay = self.get_backoff_delay()
+        self._set_state(AuthState.BACKING_OFF)
+        logger.warning(f"{self.session_name} | Authorization failed ({reason}), retry in {delay:.0f}s")
+        return time.time() + delay
+
+    def flood_wait(self, seconds: float) -> float:
+        """Telegram asked to wait; back off for that long without counting a failure."""
+        self._set_state(AuthState.BACKING_OFF)
+        logger.warning(f"{self.session_name} | FloodWait during authorization, retry in {seconds}s")
+        return time.time() + seconds
+
+    def close(self) -> None:
+        metrics.auth_states.dec(state=self.state.value)
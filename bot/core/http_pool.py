@@ -0,0 +1,73 @@
+import asyncio
+
+import aiohttp
+from aiocfscrape import CloudflareScraper
+from aiohttp_proxy import ProxyConnector
+
+from bot.config import settings
+from .headers import headers
+
+
+class HttpClientPool:
+    """One shared HTTP session per proxy (or "direct") for all accounts bound to it.
+
+    Sessions carry only the common headers; per-account values like ``Telegram-Data``
+    and ``User-Agent`` are passed with every request. Every request, including reading
+    its body, is bounded by the ``HTTP_*_TIMEOUT`` settings.
+    """
+
+    DIRECT = 'direct'
+
+    def __init__(self):
+        self._clients: dict[str, CloudflareScraper] = {}
+        self._discarded: list[CloudflareScraper] = []
+        self._closing: set[asyncio.Task] = set()
+
+    def _make_connector(self, proxy: str | None) -> aiohttp.TCPConnector:
+        connector_kwargs = dict(
+            limit=settings.HTTP_POOL_SIZE,
+            limit_per_host=settings.HTTP_POOL_SIZE,
+            keepalive_timeout=settings.HTTP_KEEPALIVE,
+            ttl_dns_cache=settings.HTTP_DNS_TTL,
+        )
+        if proxy:
+            return ProxyConnector.from_url(proxy, **connector_kwargs)
+        return aiohttp.TCPConnector(**connector_kwargs)
+
+    def get(self, proxy: str | None) -> CloudflareScraper:
+        key = proxy or self.DIRECT
+        http_client = self._clients.get(key)
+
+        if http_client is None or http_client.closed:
+            timeout = aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT,
+                                            sock_read=settings.HTTP_READ_TIMEOUT)
+            http_client = CloudflareScraper(headers=headers,
+                                            connector=self._make_connector(proxy),
+                                            cookie_jar=aiohttp.DummyCookieJar(),
+                                            timeout=timeout)
+            self._clients[key] = http_client
+
+        return http_client
+
+    def discard(self, proxy: str | None, delay: float = 60) -> None:
+        """Forget the session of a removed proxy and close it once requests still using it are done."""
+        http_client = self._clients.pop(proxy or self.DIRECT, None)
+        if http_client is not None:
+            self._discarded.append(http_client)
+            asyncio.get_running_loop().call_later(delay, self._close_discarded, http_client)
+
+    def _close_discarded(self, http_client: CloudflareScraper) -> None:
+        if http_client not in self._discarded:
+            return
+
+        self._discarded.remove(http_client)
+        task = asyncio.create_task(http_client.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._closing, return_exceptions=True)
+        for http_client in [*self._clients.values(), *self._discarded]:
+            await http_client.close()
+        self._clients.clear()
+        self._discarded.clear()
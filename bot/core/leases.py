@@ -0,0 +1,240 @@
+import asyncio
+import math
+import os
+import socket
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+
+from bot.config import settings
+from bot.utils import logger
+
+
+def get_node_id() -> str:
+    return settings.NODE_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseStore(ABC):
+    """Expiring account leases shared by every node of the fleet.
+
+    Implement it on top of any store with atomic updates to coordinate nodes through it;
+    ``SqliteLeaseStore`` keeps the leases in a SQLite file on a shared volume.
+    """
+
+    @abstractmethod
+    async def heartbeat(self, node_id: str, ttl: float) -> list[str]:
+        """Mark the node alive for ``ttl`` sec; returns the ids of all live nodes."""
+
+    @abstractmethod
+    async def renew(self, node_id: str, ttl: float) -> set[str]:
+        """Extend every lease of the node by ``ttl`` sec; returns the sessions it still holds."""
+
+    @abstractmethod
+    async def acquire(self, node_id: str, session_names: list[str], limit: int, ttl: float) -> list[str]:
+        """Lease up to ``limit`` of the sessions that are free or expired."""
+
+    @abstractmethod
+    async def release(self, node_id: str, session_names: list[str]) -> None:
+        """Hand the sessions back so that other nodes can claim them right away."""
+
+    @abstractmethod
+    async def leave(self, node_id: str) -> None:
+        """Release every lease of the node and remove it from the live nodes."""
+
+    async def close(self) -> None:
+        pass
+
+
+class SqliteLeaseStore(LeaseStore):
+    """Leases in a SQLite file that every node can open, e.g. on a shared Docker volume.
+
+    Each change runs in a ``BEGIN IMMEDIATE`` transaction, so concurrent claims of the same
+    session are serialized by the database lock, so the volume must support file locks. The
+    file uses the default rollback journal, as WAL needs shared memory between the nodes.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self._connection: sqlite3.Connection | None = None
+
+    def open(self) -> None:
+        self._connection = sqlite3.connect(self.file_name, timeout=30, check_same_thread=False,
+                                           isolation_level=None)
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS nodes (node_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS leases (session_name TEXT PRIMARY KEY, node_id TEXT NOT NULL, "
+                "expires_at REAL NOT NULL)")
+
+    async def _run(self, func: Callable, *args):
+        if self._connection is None:
+            await asyncio.to_thread(self.open)
+
+        return await asyncio.to_thread(func, *args)
+
+    def _heartbeat(self, node_id: str, ttl: float) -> list[str]:
+        now = time.time()
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "INSERT INTO nodes (node_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(node_id) DO UPDATE SET expires_at = excluded.expires_at", (node_id, now + ttl))
+            self._connection.execute("DELETE FROM nodes WHERE expires_at <= ?", (now,))
+            return [row[0] for row in self._connection.execute("SELECT node_id FROM nodes ORDER BY node_id")]
+
+    def _renew(self, node_id: str, ttl: float) -> set[str]:
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute("UPDATE leases SET expires_at = ? WHERE node_id = ?",
+                                     (time.time() + ttl, node_id))
+            return {row[0] for row in self._connection.execute(
+                "SELECT session_name FROM leases WHERE node_id = ?", (node_id,))}
+
+    def _acquire(self, node_id: str, session_names: list[str], limit: int, ttl: float) -> list[str]:
+        now = time.time()
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            taken = {row[0] for row in self._connection.execute(
+                "SELECT session_name FROM leases WHERE expires_at > ? OR node_id = ?", (now, node_id))}
+            acquired = [session_name for session_name in session_names if session_name not in taken][:limit]
+            self._connection.executemany(
+                "INSERT INTO leases (session_name, node_id, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_name) DO UPDATE SET node_id = excluded.node_id, expires_at = excluded.expires_at",
+                [(session_name, node_id, now + ttl) for session_name in acquired])
+            return acquired
+
+    def _release(self, node_id: str, session_names: list[str]) -> None:
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.executemany("DELETE FROM leases WHERE session_name = ? AND node_id = ?",
+                                         [(session_name, node_id) for session_name in session_names])
+
+    def _leave(self, node_id: str) -> None:
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute("DELETE FROM leases WHERE node_id = ?", (node_id,))
+            self._connection.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,))
+
+    async def heartbeat(self, node_id: str, ttl: float) -> list[str]:
+        return await self._run(self._heartbeat, node_id, ttl)
+
+    async def renew(self, node_id: str, ttl: float) -> set[str]:
+        return await self._run(self._renew, node_id, ttl)
+
+    async def acquire(self, node_id: str, session_names: list[str], limit: int, ttl: float) -> list[str]:
+        return await self._run(self._acquire, node_id, session_names, limit, ttl)
+
+    async def release(self, node_id: str, session_names: list[str]) -> None:
+        await self._run(self._release, node_id, session_names)
+
+    async def leave(self, node_id: str) -> None:
+        await self._run(self._leave, node_id)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class LeaseCoordinator:
+    """Runs this node's share of the sessions, claimed through leases in a ``LeaseStore``.
+
+    Every ``LEASE_RENEW_INTERVAL`` sec the node renews its heartbeat and leases, stops accounts
+    whose lease another node has taken, hands back accounts above its fair share when nodes
+    join and claims free or expired leases up to that share. Accounts of a node that is gone
+    move to the others once its leases expire after ``LEASE_TTL`` sec. A node that cannot
+    renew its leases for that long stops its accounts, so no account runs twice.
+    """
+
+    def __init__(self, lease_store: LeaseStore, node_id: str, get_session_names: Callable[[], list[str]],
+                 start: Callable[[list[str]], Awaitable[None]], stop: Callable[[list[str]], Awaitable[None]],
+                 is_busy: Callable[[str], bool]):
+        self.lease_store = lease_store
+        self.node_id = node_id
+        self.get_session_names = get_session_names
+        self.start = start
+        self.stop = stop
+        self.is_busy = is_busy
+        self.held: set[str] = set()
+        self.renewed_at = 0
+
+    async def run(self) -> None:
+        logger.info(f"Node {self.node_id} | Claiming accounts in {settings.LEASE_RENEW_INTERVAL}s")
+
+        while True:
+            try:
+                if self.renewed_at:
+                    await self.balance()
+                else:
+                    # Nodes started together see each other before anyone claims accounts
+                    await self.lease_store.heartbeat(self.node_id, settings.LEASE_TTL)
+                    self.renewed_at = time.time()
+            except Exception as error:
+                logger.error(f"Lease store error: {error}")
+                if self.held and time.time() - self.renewed_at >= settings.LEASE_TTL - settings.LEASE_RENEW_INTERVAL:
+                    logger.warning(f"Leases could not be renewed for {time.time() - self.renewed_at:.0f}s, "
+                                   f"stopping <lr>{len(self.held)}</lr> accounts")
+                    held, self.held = sorted(self.held), set()
+                    await self.stop(held)
+
+            await asyncio.sleep(settings.LEASE_RENEW_INTERVAL)
+
+    async def _stop(self, session_names: list[str], release: bool) -> None:
+        self.held.difference_update(session_names)
+        await self.stop(session_names)
+        if release:
+            await self.lease_store.release(self.node_id, session_names)
+
+    async def balance(self) -> None:
+        nodes = await self.lease_store.heartbeat(self.node_id, settings.LEASE_TTL)
+        held = await self.lease_store.renew(self.node_id, settings.LEASE_TTL)
+        self.renewed_at = time.time()
+
+        lost = sorted(self.held - held)
+        if lost:
+            logger.warning(f"Node {self.node_id} | <lr>{len(lost)}</lr> leases were taken over, stopping them")
+            await self._stop(lost, release=False)
+
+        session_names = self.get_session_names()
+        on_disk = set(session_names)
+        removed = sorted(held - on_disk)
+        if removed:
+            await self._stop(removed, release=True)
+
+        # Leases of an earlier run with the same NODE_ID
+        adopted = sorted(held & on_disk - self.held)
+        if adopted:
+            self.held.update(adopted)
+            await self.start(adopted)
+
+        share = math.ceil(len(session_names) / max(len(nodes), 1))
+        released = []
+        acquired = []
+        if len(self.held) > share:
+            # Idle accounts move first
+            released = sorted(self.held, key=lambda session_name: (self.is_busy(session_name), session_name))
+            released = released[:len(self.held) - share]
+            await self._stop(released, release=True)
+        elif len(self.held) < share:
+            candidates = [session_name for session_name in session_names if session_name not in self.held]
+            acquired = await self.lease_store.acquire(self.node_id, candidates, share - len(self.held),
+                                                      settings.LEASE_TTL)
+            if acquired:
+                self.held.update(acquired)
+                await self.start(acquired)
+
+        if released or acquired or lost:
+            logger.info(f"Node {self.node_id} | Nodes: <lc>{len(nodes)}</lc>, accounts: <lc>{len(self.held)}</lc> "
+                        f"(<lc>+{len(acquired)}</lc> / <lr>-{len(released) + len(lost)}</lr>), "
+                        f"share: <lc>{share}</lc>")
+
+    async def close(self) -> None:
+        """Hand back every lease; call after the accounts have been stopped and their state saved."""
+        try:
+            await self.lease_store.leave(self.node_id)
+        except Exception as error:
+            logger.error(f"Lease store error: {error}")
+        await self.lease_store.close()
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class League:
+    id: int = 0
+    title: str = ''
+    mining_speed: float = 0
+
+    @classmethod
+    def from_json(cls, data: dict | None) -> 'League':
+        data = data or {}
+        return cls(
+            id=data.get('leagueId') or 0,
+            title=data.get('title') or '',
+            mining_speed=data.get('miningSpeed') or 0,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class UserStats:
+    points: float = 0
+    daily_streak: int = 0
+    league: League = League()
+
+    @classmethod
+    def from_json(cls, data: dict | None) -> 'UserStats':
+        data = data or {}
+        return cls(
+            points=data.get('pointsCount') or 0,
+            daily_streak=data.get('dailyBonusStreakCount') or 0,
+            league=League.from_json(data.get('currentLeague')),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Quest:
+    id: int
+    title: str
+    points: float
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'Quest':
+        return cls(id=data['id'], title=data['title'], points=data['bonusPoints'])
@@ -0,0 +1,221 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+import aiohttp
+from better_proxy import Proxy
+
+from bot.config import settings
+from bot.utils import logger, metrics
+from .http_pool import HttpClientPool
+from .state_store import StateStore
+
+
+EWMA_ALPHA = 0.2
+
+
+@dataclass(slots=True)
+class ProxyHealth:
+    healthy: bool | None = None
+    checked_at: float = 0
+    latency: float | None = None
+    failure_rate: float = 0
+    failures: int = 0
+
+    def record(self, latency: float | None, ok: bool) -> None:
+        if ok and latency is not None:
+            self.latency = latency if self.latency is None else self.latency + EWMA_ALPHA * (latency - self.latency)
+        self.failure_rate += EWMA_ALPHA * ((0 if ok else 1) - self.failure_rate)
+        self.failures = 0 if ok else self.failures + 1
+
+
+def get_proxy_label(proxy: str) -> str:
+    try:
+        proxy = Proxy.from_str(proxy)
+        return f"{proxy.host}:{proxy.port}"
+    except ValueError:
+        return '<invalid>'
+
+
+class ProxyPool:
+    """Proxies of the process, checked once and shared by all accounts.
+
+    Check results are cached for ``PROXY_CHECK_TTL`` sec; real requests keep the rolling
+    latency and failure rate up to date. A proxy that fails ``PROXY_MAX_FAILURES`` requests
+    in a row is taken out of rotation and re-checked in the background.
+    """
+
+    CHECK_URL = 'https://httpbin.org/ip'
+
+    def __init__(self, proxies: list[str], http_pool: HttpClientPool, store: StateStore):
+        self.proxies = list(dict.fromkeys(proxies))
+        self.http_pool = http_pool
+        self.store = store
+        self.health = {proxy: ProxyHealth() for proxy in self.proxies}
+        self.sessions: dict[str, set[str]] = {proxy: set() for proxy in self.proxies}
+        self._assigned: dict[str, str] = {}
+        self._checks: dict[str, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(max(settings.PROXY_CHECK_CONCURRENCY, 1))
+        self._rechecker: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if not self.proxies:
+            return
+
+        await self.check_all()
+        healthy = sum(self.is_healthy(proxy) for proxy in self.proxies)
+        logger.info(f"Proxies checked | <lc>{healthy}</lc> of <lc>{len(self.proxies)}</lc> healthy")
+        self._rechecker = asyncio.create_task(self._recheck_periodically())
+
+    async def update(self, proxies: list[str]) -> dict[str, list[str]]:
+        """Switch to a new proxy list; returns sessions of every removed proxy, which must move."""
+        proxies = list(dict.fromkeys(proxies))
+        added = [proxy for proxy in proxies if proxy not in self.health]
+        removed = {proxy: sorted(self.sessions[proxy]) for proxy in self.proxies if proxy not in proxies}
+
+        self.proxies = proxies
+        for proxy, session_names in removed.items():
+            del self.health[proxy]
+            del self.sessions[proxy]
+            for session_name in session_names:
+                self._assigned.pop(session_name, None)
+
+        for proxy in added:
+            self.health[proxy] = ProxyHealth()
+            self.sessions[proxy] = set()
+
+        if added:
+            await self.check_all(added)
+        if self.proxies and self._rechecker is None:
+            self._rechecker = asyncio.create_task(self._recheck_periodically())
+
+        self._update_metrics()
+        return removed
+
+    async def close(self) -> None:
+        if self._rechecker is not None:
+            self._rechecker.cancel()
+            self._rechecker = None
+
+        for task in self._checks.values():
+            task.cancel()
+
+    async def check_all(self, proxies: list[str] | None = None) -> None:
+        await asyncio.gather(*(self.check(proxy) for proxy in (self.proxies if proxies is None else proxies)))
+
+    async def check(self, proxy: str) -> bool:
+        task = self._checks.get(proxy)
+        if task is None:
+            task = self._checks[proxy] = asyncio.create_task(self._check(proxy))
+            task.add_done_callback(lambda _: self._checks.pop(proxy, None))
+
+        return await asyncio.shield(task)
+
+    async def _check(self, proxy: str) -> bool:
+        health = self.health[proxy]
+        was_healthy = health.healthy
+
+        async with self._semaphore:
+            started_at = time.perf_counter()
+            try:
+                http_client = self.http_pool.get(proxy)
+                timeout = aiohttp.ClientTimeout(total=settings.PROXY_CHECK_TIMEOUT)
+                async with http_client.get(url=self.CHECK_URL, timeout=timeout) as response:
+                    ip = (await response.json()).get('origin')
+            except Exception as error:
+                health.record(None, ok=False)
+                health.healthy = False
+                if was_healthy is not False:
+                    escaped_error = str(error).replace('<', '&lt;').replace('>', '&gt;')
+                    logger.error(f"Proxy: {get_proxy_label(proxy)} | Error: {escaped_error or type(error).__name__}")
+            else:
+                health.record(time.perf_counter() - started_at, ok=True)
+                health.healthy = True
+                if was_healthy is not True:
+                    logger.info(f"Proxy: {get_proxy_label(proxy)} | IP: {ip} | "
+                                f"Latency: <lc>{health.latency * 1000:.0f}</lc> ms")
+            finally:
+                health.checked_at = time.time()
+
+        self._update_metrics()
+        return health.healthy
+
+    async def _recheck_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.PROXY_RECHECK_INTERVAL)
+
+            expired_at = time.time() - settings.PROXY_CHECK_TTL
+            proxies = [proxy for proxy, health in self.health.items()
+                       if health.healthy is False or health.checked_at <= expired_at]
+            if proxies:
+                await self.check_all(proxies)
+
+    def _update_metrics(self) -> None:
+        metrics.healthy_proxies.set(sum(health.healthy is not False for health in self.health.values()))
+
+    def is_healthy(self, proxy: str | None) -> bool:
+        if proxy is None:
+            return True
+
+        health = self.health.get(proxy)
+        return health is not None and health.healthy is not False
+
+    def record(self, proxy: str | None, latency: float | None, ok: bool) -> None:
+        """Feed the result of a real request through ``proxy`` into its health stats."""
+        health = self.health.get(proxy)
+        if health is None:
+            return
+
+        health.record(latency, ok)
+        if ok:
+            health.checked_at = time.time()
+        elif health.healthy is not False and health.failures >= settings.PROXY_MAX_FAILURES:
+            health.healthy = False
+            self._update_metrics()
+            logger.warning(f"Proxy: {get_proxy_label(proxy)} | {health.failures} failed requests in a row, "
+                           f"moving its accounts to other proxies")
+
+    def _has_capacity(self, proxy: str, session_name: str) -> bool:
+        sessions = self.sessions[proxy]
+        return not settings.PROXY_MAX_SESSIONS or session_name in sessions \
+            or len(sessions) < settings.PROXY_MAX_SESSIONS
+
+    def _get_score(self, proxy: str) -> tuple:
+        health = self.health[proxy]
+        latency = health.latency if health.latency is not None else settings.PROXY_CHECK_TIMEOUT
+        return len(self.sessions[proxy]), round(health.failure_rate, 1), latency
+
+    def assign(self, session_name: str) -> str | None:
+        """Pick a proxy for the session: the one it used before while that stays healthy and
+        has room, otherwise the least loaded healthy proxy with the lowest latency."""
+        if not self.proxies:
+            return None
+
+        current = self._assigned.get(session_name) or self.store.get(session_name).get('proxy')
+        if current in self.health and self.is_healthy(current) and self._has_capacity(current, session_name):
+            return self._bind(session_name, current)
+
+        candidates = [proxy for proxy in self.proxies
+                      if self.is_healthy(proxy) and self._has_capacity(proxy, session_name)]
+        if not candidates:
+            candidates = [proxy for proxy in self.proxies if self.is_healthy(proxy)] or self.proxies
+            logger.warning(f"{session_name} | No healthy proxy with free capacity, using the least loaded one")
+
+        return self._bind(session_name, min(candidates, key=self._get_score))
+
+    def _bind(self, session_name: str, proxy: str) -> str:
+        previous = self._assigned.get(session_name)
+        if previous is not None and previous != proxy:
+            self.sessions[previous].discard(session_name)
+
+        self._assigned[session_name] = proxy
+        self.sessions[proxy].add(session_name)
+        if self.store.get(session_name).get('proxy') != proxy:
+            self.store.update(session_name, proxy=proxy)
+
+        return proxy
+
+    def release(self, session_name: str) -> None:
+        proxy = self._assigned.pop(session_name, None)
+        if proxy is not None:
+            self.sessions[proxy].discard(session_name)
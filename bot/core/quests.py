@@ -0,0 +1,33 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from bot.config import settings
+from .models import Quest
+
+
+class QuestCatalogue:
+    """Quest list shared by all accounts, refetched at most once per ``QUEST_CATALOGUE_TTL``."""
+
+    def __init__(self):
+        self._quests: list[Quest] | None = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return self._quests is not None and time.time() - self._fetched_at < settings.QUEST_CATALOGUE_TTL
+
+    async def get(self, fetch: Callable[[], Awaitable[list[Quest] | None]]) -> list[Quest]:
+        if self.is_fresh():
+            return self._quests
+
+        async with self._lock:
+            if not self.is_fresh():
+                quests = await fetch()
+                if quests is None:
+                    return self._quests or []
+
+                self._quests = quests
+                self._fetched_at = time.time()
+
+        return self._quests
@@ -0,0 +1,92 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+from bot.config import settings
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RateLimiter:
+    """Host-wide token bucket plus optional per-proxy buckets for requests to the API.
+
+    A 429 pauses every request going through the same proxy (or the direct connection)
+    for the ``Retry-After`` period.
+    """
+
+    DIRECT = 'direct'
+
+    def __init__(self):
+        self._host_bucket: TokenBucket | None = None
+        self._proxy_buckets: dict[str, TokenBucket] = {}
+        self._paused_until: dict[str, float] = {}
+        self.set_share(1)
+
+    def set_share(self, share: float) -> None:
+        """Limit this process to ``share`` of the host-wide rate, e.g. one of several workers."""
+        self._host_bucket = TokenBucket(settings.RATE_LIMIT * share, settings.RATE_LIMIT_BURST * share) \
+            if settings.RATE_LIMIT > 0 else None
+
+    def pause(self, proxy: str | None, delay: float) -> None:
+        key = proxy or self.DIRECT
+        self._paused_until[key] = max(self._paused_until.get(key, 0), time.monotonic() + delay)
+
+    async def acquire(self, proxy: str | None) -> None:
+        key = proxy or self.DIRECT
+
+        delay = self._paused_until.get(key, 0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self._host_bucket is not None:
+            await self._host_bucket.acquire()
+
+        if settings.PROXY_RATE_LIMIT > 0:
+            bucket = self._proxy_buckets.get(key)
+            if bucket is None:
+                bucket = self._proxy_buckets[key] = TokenBucket(settings.PROXY_RATE_LIMIT,
+                                                                settings.PROXY_RATE_LIMIT_BURST)
+            await bucket.acquire()
+
+
+def get_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_backoff_delay(attempt: int) -> float:
+    return random.uniform(0, min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF * 2 ** attempt))
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,73 @@
+import gzip
+import hashlib
+import json
+import time
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from bot.utils import logger
+
+
+REDACTED = '***'
+SECRET_FIELDS = frozenset({
+    'telegramId', 'referrerTelegramId', 'userId', 'username', 'firstName', 'lastName', 'photoUrl',
+    'initData', 'tgWebAppData', 'hash', 'token', 'accessToken',
+})
+RECORDED_HEADERS = ('Content-Type', 'Retry-After')
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if key in SECRET_FIELDS else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def redact_query(query: str) -> str:
+    return urlencode([(key, REDACTED if key in SECRET_FIELDS else value)
+                      for key, value in parse_qsl(query, keep_blank_values=True)], safe='*')
+
+
+class HttpRecorder:
+    """Streams every API exchange of ``Tapper.make_request`` to gzip-compressed JSON lines.
+
+    Request headers (``Telegram-Data``, ``User-Agent``) are never written, session names are
+    replaced by a short hash and ``SECRET_FIELDS`` are masked in queries and JSON bodies.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.file = gzip.open(file_name, 'at', encoding='utf-8')
+        self.started_at = time.perf_counter()
+        self.records = 0
+
+    def record(self, session_name: str, method: str, url: str, payload, started_at: float,
+               status: int | None = None, headers=None, body: bytes = b'', error: str | None = None) -> None:
+        """Write one request started at ``started_at`` (``time.perf_counter``) and finished now."""
+        duration = time.perf_counter() - started_at
+        parts = urlsplit(url)
+        entry = {
+            'at': round(started_at - self.started_at, 4),
+            'account': hashlib.blake2s(session_name.encode(), digest_size=4).hexdigest(),
+            'method': method,
+            'path': parts.path,
+            'query': redact_query(parts.query),
+            'request': redact(payload),
+            'status': status,
+            'duration': round(duration, 4),
+        }
+        if error is not None:
+            entry['error'] = error
+        else:
+            entry['headers'] = {name: headers[name] for name in RECORDED_HEADERS if name in headers}
+            try:
+                entry['body'] = redact(json.loads(body)) if body else None
+            except ValueError:
+                entry['text'] = body.decode('utf-8', errors='replace')
+
+        self.file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.records += 1
+
+    def close(self) -> None:
+        self.file.close()
+        logger.info(f"Recorded {self.records} API requests to {self.file_name}")
@@ -0,0 +1,100 @@
+import asyncio
+import gzip
+import json
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict
+
+
+class ReplayResponse:
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = CIMultiDict(headers)
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self) -> str:
+        return self._body.decode('utf-8')
+
+    async def json(self, **kwargs):
+        return json.loads(self._body) if self._body else None
+
+    def release(self) -> None:
+        pass
+
+
+class ReplaySession:
+    closed = False
+
+    def __init__(self, pool: 'ReplayHttpPool'):
+        self.pool = pool
+
+    async def request(self, method: str, url: str, **kwargs) -> ReplayResponse:
+        return await self.pool.respond(method, url)
+
+    async def close(self) -> None:
+        pass
+
+
+class ReplayHttpPool:
+    """Offline stand-in for ``HttpClientPool`` answering from an ``HttpRecorder`` file.
+
+    Requests are matched by method and path; the recorded responses of each endpoint are
+    served in order and then from the start again. Every response takes its recorded
+    duration divided by ``speed``, 0 - no delay. Unknown endpoints get a 404.
+    """
+
+    def __init__(self, file_name: str, speed: float = 1):
+        self.speed = speed
+        self.records: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        self._positions: Counter = Counter()
+        self._session = ReplaySession(self)
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+
+        with gzip.open(file_name, 'rt', encoding='utf-8') as file:
+            for line in file:
+                record = json.loads(line)
+                self.records[(record['method'], record['path'])].append(record)
+
+    def get(self, proxy: str | None) -> ReplaySession:
+        return self._session
+
+    def discard(self, proxy: str | None, delay: float = 60) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def respond(self, method: str, url: str) -> ReplayResponse:
+        path = urlsplit(url).path
+        self.requests[path.removeprefix('/api/')] += 1
+        records = self.records.get((method, path))
+        if not records:
+            self.statuses[404] += 1
+            return ReplayResponse(404, {}, b'')
+
+        key = (method, path)
+        record = records[self._positions[key] % len(records)]
+        self._positions[key] += 1
+
+        if self.speed:
+            await asyncio.sleep(record['duration'] / self.speed)
+
+        if record.get('error'):
+            self.statuses[record['error']] += 1
+            if 'Timeout' in record['error']:
+                raise asyncio.TimeoutError(record['error'])
+            raise aiohttp.ClientConnectionError(record['error'])
+
+        self.statuses[record['status']] += 1
+        if 'body' in record:
+            body = json.dumps(record['body']).encode() if record['body'] is not None else b''
+        else:
+            body = record.get('text', '').encode()
+
+        return ReplayResponse(record['status'], record.get('headers') or {}, body)
@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter
+
+from bot.utils import logger, metrics
+from bot.exceptions import InvalidSession
+
+
+class Scheduler:
+    """Single deadline queue for every account in the process.
+
+    Entries are ``(due_time, seq, session_name, action)``. An action is dispatched only
+    when it is due, and never more than ``max_in_flight`` actions run at once. Each
+    action returns a ``{action: due_time}`` dict with the follow-up work for the account.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self._heap: list[tuple[float, int, str, str]] = []
+        self._counter = itertools.count()
+        self._pending: dict[tuple[str, str], int] = {}
+        self._accounts = {}
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._wakeup = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+        self._running: dict[str, asyncio.Task] = {}
+        self.counters = Counter()
+
+    def add(self, account, action: str, due: float | None = None) -> None:
+        self._accounts[account.session_name] = account
+        metrics.active_accounts.set(len(self._accounts))
+        self.schedule(account.session_name, action, due)
+
+    def remove(self, session_name: str):
+        account = self._accounts.pop(session_name, None)
+        for key in [key for key in self._pending if key[0] == session_name]:
+            del self._pending[key]
+        metrics.active_accounts.set(len(self._accounts))
+        return account
+
+    def get(self, session_name: str):
+        return self._accounts.get(session_name)
+
+    def is_running(self, session_name: str) -> bool:
+        return session_name in self._running
+
+    async def cancel(self, session_name: str) -> None:
+        """Drop the account, then cancel its running action; the action is not retried."""
+        account = self.remove(session_name)
+        task = self._running.get(session_name)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        if account is not None:
+            await account.close()
+        self._wakeup.set()
+
+    def schedule(self, session_name: str, action: str, due: float | None = None) -> None:
+        seq = next(self._counter)
+        self._pending[(session_name, action)] = seq
+        heapq.heappush(self._heap, (due or time.time(), seq, session_name, action))
+        self._wakeup.set()
+
+    def _is_stale(self, seq: int, session_name: str, action: str) -> bool:
+        return session_name not in self._accounts or self._pending.get((session_name, action)) != seq
+
+    async def run(self, keep_alive: bool = False) -> None:
+        """Dispatch due actions until no accounts are left, or forever with ``keep_alive``."""
+        while self._accounts or self._tasks or keep_alive:
+            self._wakeup.clear()
+
+            while self._heap and self._is_stale(*self._heap[0][1:]):
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._semaphore.acquire()
+            due, seq, session_name, action = heapq.heappop(self._heap)
+            if self._is_stale(seq, session_name, action):
+                self._semaphore.release()
+                continue
+
+            del self._pending[(session_name, action)]
+            task = asyncio.create_task(self._dispatch(session_name, action), name=session_name)
+            self._tasks.add(task)
+            self._running[session_name] = task
+            task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if self._running.get(task.get_name()) is task:
+            del self._running[task.get_name()]
+        self._wakeup.set()
+
+    async def _dispatch(self, session_name: str, action: str) -> None:
+        account = self._accounts.get(session_name)
+        if account is None:
+            self._semaphore.release()
+            return
+
+        self.counters['actions'] += 1
+        try:
+            follow_up = await account.dispatch(action)
+        except asyncio.CancelledError:
+            # Interrupted by drain or close: the action is due again right away, e.g. after a restart.
+            # An account dropped by cancel is gone, and may already be back as a new account.
+            if self._accounts.get(session_name) is account:
+                self.schedule(session_name, action)
+            raise
+        except InvalidSession:
+            self.counters['invalid_sessions'] += 1
+            logger.error(f"{session_name} | Invalid Session")
+            if self._accounts.get(session_name) is account:
+                await self._retire(session_name)
+            return
+        except Exception as error:
+            self.counters['errors'] += 1
+            logger.error(f"{session_name} | Unknown error in <ly>{action}</ly>: {error}")
+            follow_up = {action: time.time() + 3}
+        finally:
+            self._semaphore.release()
+
+        if self._accounts.get(session_name) is not account:
+            return
+
+        if not follow_up:
+            await self._retire(session_name)
+            return
+
+        for next_action, due in follow_up.items():
+            self.schedule(session_name, next_action, due)
+
+    async def _retire(self, session_name: str) -> None:
+        account = self.remove(session_name)
+        if account is not None:
+            await account.close()
+        self._wakeup.set()
+
+    def pending(self) -> dict[str, tuple[str, float]]:
+        """Next action and its due time for every account."""
+        pending = {}
+        for due, seq, session_name, action in sorted(self._heap):
+            if not self._is_stale(seq, session_name, action):
+                pending.setdefault(session_name, (action, due))
+
+        return pending
+
+    async def drain(self, timeout: float) -> None:
+        """Give running actions up to ``timeout`` sec to finish, then cancel the rest.
+
+        Call once ``run`` has been stopped, so that no new actions are started.
+        """
+        if self._tasks and timeout > 0:
+            logger.info(f"Waiting up to {timeout}s for {len(self._tasks)} running actions to finish")
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def summary(self) -> dict[str, int]:
+        return {'accounts': len(self._accounts), 'in_flight': len(self._tasks), **self.counters}
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        for session_name in list(self._accounts):
+            await self._retire(session_name)
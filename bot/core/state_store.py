@@ -0,0 +1,277 @@
+import asyncio
+import json
+import sqlite3
+import time
+from urllib.parse import parse_qs
+
+from bot.config import settings
+from bot.utils import logger
+
+
+ACCOUNT_COLUMNS = (
+    'session_name', 'user_agent', 'user_id', 'tg_web_data', 'tg_web_data_expires_at',
+    'started', 'last_stats', 'last_run_at', 'proxy', 'last_claims', 'next_action', 'next_run_at', 'parked_quests',
+)
+JSON_COLUMNS = ('last_stats', 'last_claims', 'parked_quests')
+
+MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS accounts (
+        session_name TEXT PRIMARY KEY,
+        user_agent TEXT,
+        user_id INTEGER,
+        tg_web_data TEXT,
+        tg_web_data_expires_at REAL,
+        started INTEGER NOT NULL DEFAULT 0,
+        last_stats TEXT,
+        last_run_at REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS completed_quests (
+        session_name TEXT NOT NULL,
+        quest_id INTEGER NOT NULL,
+        PRIMARY KEY (session_name, quest_id)
+    )
+    """,
+    "ALTER TABLE accounts ADD COLUMN proxy TEXT",
+    "ALTER TABLE accounts ADD COLUMN last_claims TEXT",
+    "ALTER TABLE accounts ADD COLUMN next_action TEXT",
+    "ALTER TABLE accounts ADD COLUMN next_run_at REAL",
+    "ALTER TABLE accounts ADD COLUMN parked_quests TEXT",
+]
+
+
+def get_auth_date(tg_web_data: str) -> int:
+    try:
+        return int(parse_qs(tg_web_data).get('auth_date', ['0'])[0])
+    except ValueError:
+        return 0
+
+
+def load_json_file(file_name: str):
+    try:
+        with open(file_name, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class StateStore:
+    """Per-session state kept in one SQLite database (WAL mode).
+
+    All rows are loaded once on ``open``; lookups are served from memory and changes
+    are written back in batches by a background task every ``STATE_FLUSH_INTERVAL`` sec.
+    With ``LEASE_STORE`` the database is shared by several nodes, so it uses the rollback
+    journal like the lease file: WAL needs shared memory between the nodes.
+    """
+
+    def __init__(self, file_name: str = "bot_state.db"):
+        self.file_name = file_name
+        self._connection: sqlite3.Connection | None = None
+        self._accounts: dict[str, dict] = {}
+        self._dirty: set[str] = set()
+        self._completed_quests: dict[str, set[int]] = {}
+        self._new_completed_quests: list[tuple[str, int]] = []
+        self._lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+
+    def open(self) -> None:
+        self._connection = sqlite3.connect(self.file_name, timeout=30, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute(f"PRAGMA journal_mode={'DELETE' if settings.LEASE_STORE else 'WAL'}")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._load(self._connection.execute("SELECT * FROM accounts").fetchall(),
+                   self._connection.execute("SELECT session_name, quest_id FROM completed_quests").fetchall())
+
+    def _load(self, rows: list[sqlite3.Row], completed_quests: list[tuple[str, int]]) -> None:
+        for row in rows:
+            account = dict(row)
+            for column in JSON_COLUMNS:
+                account[column] = json.loads(account[column]) if account[column] else None
+            self._accounts[account['session_name']] = account
+
+        for session_name, quest_id in completed_quests:
+            self._completed_quests.setdefault(session_name, set()).add(quest_id)
+
+    def _read(self, session_names: list[str]) -> tuple[list[sqlite3.Row], list[tuple[str, int]]]:
+        rows, completed_quests = [], []
+        for index in range(0, len(session_names), 500):
+            chunk = session_names[index:index + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            rows += self._connection.execute(
+                f"SELECT * FROM accounts WHERE session_name IN ({placeholders})", chunk).fetchall()
+            completed_quests += self._connection.execute(
+                f"SELECT session_name, quest_id FROM completed_quests WHERE session_name IN ({placeholders})",
+                chunk).fetchall()
+
+        return rows, completed_quests
+
+    async def refresh(self, session_names: list[str]) -> None:
+        """Re-read accounts another process may have changed, e.g. before taking them over."""
+        async with self._lock:
+            rows, completed_quests = await asyncio.to_thread(self._read, session_names)
+            self._load(rows, completed_quests)
+
+    def _migrate(self) -> None:
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+
+        for number, statement in enumerate(MIGRATIONS[version:], start=version + 1):
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.execute(statement)
+                if number == 1:
+                    self._import_json_files()
+                self._connection.execute(f"PRAGMA user_version={number}")
+
+    def _import_json_files(self) -> None:
+        user_agents = [(session['session_name'], session['user_agent'])
+                       for session in load_json_file("user_agents.json") or []]
+
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO accounts (session_name, user_agent) VALUES (?, ?)", user_agents)
+
+        if user_agents:
+            logger.info(f"Migrated {len(user_agents)} user agents from user_agents.json to {self.file_name}")
+
+    async def start(self) -> None:
+        if self._connection is None:
+            self.open()
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.STATE_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except sqlite3.Error as error:
+                logger.error(f"State store flush error: {error}")
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._dirty and not self._new_completed_quests:
+                return
+
+            session_names, self._dirty = self._dirty, set()
+            completed_quests, self._new_completed_quests = self._new_completed_quests, []
+            rows = []
+            for session_name in session_names:
+                account = self._accounts[session_name]
+                row = [account.get(column) for column in ACCOUNT_COLUMNS]
+                for column in JSON_COLUMNS:
+                    if account.get(column) is not None:
+                        row[ACCOUNT_COLUMNS.index(column)] = json.dumps(account[column])
+                rows.append(row)
+
+            write = asyncio.ensure_future(asyncio.to_thread(self._write, rows, completed_quests))
+            try:
+                await asyncio.shield(write)
+            except (sqlite3.Error, asyncio.CancelledError):
+                # A cancelled write goes on in its thread; it must end before the connection is used again
+                await asyncio.wait({write})
+                self._dirty |= session_names
+                self._new_completed_quests.extend(completed_quests)
+                raise
+
+    def _write(self, rows: list[list], completed_quests: list[tuple[str, int]]) -> None:
+        columns = ', '.join(ACCOUNT_COLUMNS)
+        placeholders = ', '.join('?' * len(ACCOUNT_COLUMNS))
+        with self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO accounts ({columns}) VALUES ({placeholders})", rows)
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO completed_quests (session_name, quest_id) VALUES (?, ?)", completed_quests)
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        if self._connection is not None:
+            await self.flush()
+            self._connection.close()
+            self._connection = None
+
+    def get(self, session_name: str) -> dict:
+        return self._accounts.get(session_name) or {}
+
+    def update(self, session_name: str, **fields) -> None:
+        account = self._accounts.setdefault(session_name, {'session_name': session_name, 'started': 0})
+        account.update(fields)
+        self._dirty.add(session_name)
+
+    def get_tg_web_data(self, session_name: str) -> tuple[str, int] | None:
+        account = self.get(session_name)
+        if not account.get('tg_web_data') or (account.get('tg_web_data_expires_at') or 0) <= time.time():
+            return None
+
+        return account['tg_web_data'], account['user_id']
+
+    def set_tg_web_data(self, session_name: str, tg_web_data: str, user_id: int) -> None:
+        auth_date = get_auth_date(tg_web_data) or int(time.time())
+        self.update(session_name, tg_web_data=tg_web_data, user_id=user_id,
+                    tg_web_data_expires_at=auth_date + settings.TG_WEB_DATA_TTL)
+
+    def invalidate_tg_web_data(self, session_name: str) -> None:
+        self.update(session_name, tg_web_data=None, tg_web_data_expires_at=None)
+
+    def is_started(self, session_name: str) -> bool:
+        return bool(self.get(session_name).get('started'))
+
+    def mark_started(self, session_name: str) -> None:
+        self.update(session_name, started=1)
+
+    def get_claimed_at(self, session_name: str, action: str) -> float | None:
+        return (self.get(session_name).get('last_claims') or {}).get(action)
+
+    def set_claimed_at(self, session_name: str, action: str, claimed_at: float | None = None) -> None:
+        last_claims = dict(self.get(session_name).get('last_claims') or {})
+        last_claims[action] = claimed_at or time.time()
+        self.update(session_name, last_claims=last_claims)
+
+    def get_next_run(self, session_name: str) -> tuple[str, float] | None:
+        """Action and due time of the account checkpointed at the last shutdown."""
+        account = self.get(session_name)
+        if not account.get('next_action') or account.get('next_run_at') is None:
+            return None
+
+        return account['next_action'], account['next_run_at']
+
+    def set_next_run(self, session_name: str, action: str, run_at: float) -> None:
+        self.update(session_name, next_action=action, next_run_at=run_at)
+
+    def get_completed_quests(self, session_name: str) -> set[int]:
+        return self._completed_quests.get(session_name, set())
+
+    def add_completed_quest(self, session_name: str, quest_id: int) -> None:
+        completed_quests = self._completed_quests.setdefault(session_name, set())
+        if quest_id not in completed_quests:
+            completed_quests.add(quest_id)
+            self._new_completed_quests.append((session_name, quest_id))
+
+    def is_quest_parked(self, session_name: str, quest_id: int) -> bool:
+        parked = (self.get(session_name).get('parked_quests') or {}).get(str(quest_id))
+        return bool(parked) and (parked.get('until') or 0) > time.time()
+
+    def record_quest_failure(self, session_name: str, quest_id: int) -> bool:
+        """Count a rejected claim; after ``QUEST_MAX_ATTEMPTS`` in a row the quest is parked
+        for ``QUEST_PARK_TIME`` sec. Returns True when the quest got parked."""
+        parked_quests = dict(self.get(session_name).get('parked_quests') or {})
+        failures = (parked_quests.get(str(quest_id)) or {}).get('failures', 0) + 1
+        until = None
+        if failures >= settings.QUEST_MAX_ATTEMPTS:
+            failures, until = 0, time.time() + settings.QUEST_PARK_TIME
+
+        parked_quests[str(quest_id)] = {'failures': failures, 'until': until}
+        self.update(session_name, parked_quests=parked_quests)
+        return until is not None
+
+    def clear_quest_failures(self, session_name: str, quest_id: int) -> None:
+        parked_quests = self.get(session_name).get('parked_quests') or {}
+        if str(quest_id) in parked_quests:
+            parked_quests = {key: value for key, value in parked_quests.items() if key != str(quest_id)}
+            self.update(session_name, parked_quests=parked_quests)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+StepFunc = Callable[[dict[str, Any]], Awaitable[Any]]
+
+
+class StepExecutor:
+    """Runs the steps of one account cycle as a small DAG.
+
+    A step starts once all steps listed in ``after`` are done and receives their results.
+    Independent steps run concurrently, at most ``limit`` at a time. With a ``timeout``
+    every step is cancelled at the cycle deadline; its name goes to ``timed_out`` and
+    steps after it see no result for it. A ``timer`` is called with the name and duration
+    of every finished step.
+    """
+
+    def __init__(self, limit: int, delay: float = 0, timeout: float | None = None,
+                 timer: Callable[[str, float], None] | None = None):
+        self._steps: dict[str, tuple[StepFunc, tuple[str, ...]]] = {}
+        self._semaphore = asyncio.Semaphore(limit)
+        self._delay = delay
+        self._timeout = timeout
+        self._timer = timer
+        self.timed_out: list[str] = []
+
+    def add(self, name: str, func: StepFunc, after: tuple[str, ...] = ()) -> None:
+        for dependency in after:
+            if dependency not in self._steps:
+                raise ValueError(f"Step {name} depends on unknown step {dependency}")
+        if self._timer is not None:
+            func = self._timed(name, func)
+        self._steps[name] = (func, after)
+
+    def _timed(self, name: str, func: StepFunc) -> StepFunc:
+        async def timed(results: dict[str, Any]):
+            started_at = time.perf_counter()
+            try:
+                return await func(results)
+            finally:
+                self._timer(name, time.perf_counter() - started_at)
+
+        return timed
+
+    async def run(self) -> dict[str, Any]:
+        results: dict[str, Any] = {}
+        tasks: dict[str, asyncio.Task] = {}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._timeout if self._timeout else None
+
+        async def run_step(name: str, func: StepFunc, after: tuple[str, ...]):
+            if after:
+                await asyncio.gather(*(tasks[dependency] for dependency in after))
+
+            async with self._semaphore:
+                if self._delay:
+                    await asyncio.sleep(self._delay)
+                if deadline is None:
+                    results[name] = await func(results)
+                    return
+
+                try:
+                    results[name] = await asyncio.wait_for(func(results), timeout=max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    if loop.time() < deadline:
+                        raise
+                    self.timed_out.append(name)
+
+        for name, (func, after) in self._steps.items():
+            tasks[name] = asyncio.create_task(run_step(name, func, after))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return results
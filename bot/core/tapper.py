@@ -1,82 +1,92 @@
 import asyncio
 import time
+from typing import TYPE_CHECKING
 from urllib.parse import unquote, quote
 
 import aiohttp
-import json
-from aiocfscrape import CloudflareScraper
-from aiohttp_proxy import ProxyConnector
 from better_proxy import Proxy
-from pyrogram import Client
-from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered, FloodWait
-from pyrogram.raw.functions.messages import RequestWebView
-from datetime import datetime, timedelta
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
 from .agents import generate_random_user_agent
 
-from bot.utils import logger
-from bot.exceptions import InvalidSession
-from .headers import headers
+from bot.utils import logger, metrics
+from bot.utils.profiler import profiler
+from bot.exceptions import InvalidSession, InvalidTgWebData, TelegramFloodWait
+from .auth import AuthLifecycle, AuthState
+from .http_pool import HttpClientPool
+from .proxy_pool import ProxyPool
+from .recorder import HttpRecorder
+from .tg_clients import TgClientManager
+from .state_store import StateStore
+from .quests import QuestCatalogue
+from .steps import StepExecutor
+from .rate_limit import rate_limiter, get_retry_after, get_backoff_delay
+from .api import SnapsterApi
+from .models import UserStats, Quest
 from bot.config import settings
 
+if TYPE_CHECKING:
+    from pyrogram import Client
+
 
 class Tapper:
-    def __init__(self, tg_client: Client):
-        self.session_name = tg_client.name
-        self.tg_client = tg_client
+    API_URL = "https://prod.snapster.bot/api"
+
+    def __init__(self, session_name: str, tg_clients: TgClientManager, http_pool: HttpClientPool,
+                 store: StateStore, quest_catalogue: QuestCatalogue, proxy_pool: ProxyPool | None = None,
+                 recorder: HttpRecorder | None = None, read_only: bool = False):
+        self.session_name = session_name
+        # Status sweep: no /start message to the bot and no API writes
+        self.read_only = read_only
+        self.tg_clients = tg_clients
+        self.http_pool = http_pool
+        self.proxy_pool = proxy_pool
+        self.recorder = recorder
+        self.proxy = proxy_pool.assign(self.session_name) if proxy_pool else None
+        self.http_client = http_pool.get(self.proxy)
+        self.store = store
+        self.auth = AuthLifecycle(session_name)
+        self.api = SnapsterApi(request=self.make_request)
+        self.quest_catalogue = quest_catalogue
+        self.tg_web_data = None
         self.user_id = 0
         self.first_run = False
-        self.session_ug_dict = self.load_user_agents() or []
-
-        headers['User-Agent'] = self.check_user_agent()
+        self.user_agent = self.check_user_agent()
 
     async def generate_random_user_agent(self):
         return generate_random_user_agent(device_type='android', browser_type='chrome')
 
-    def save_user_agent(self):
-        user_agents_file_name = "user_agents.json"
-
-        if not any(session['session_name'] == self.session_name for session in self.session_ug_dict):
-            user_agent_str = generate_random_user_agent()
-
-            self.session_ug_dict.append({
-                'session_name': self.session_name,
-                'user_agent': user_agent_str})
+    def check_user_agent(self):
+        user_agent = self.store.get(self.session_name).get('user_agent')
 
-            with open(user_agents_file_name, 'w') as user_agents:
-                json.dump(self.session_ug_dict, user_agents, indent=4)
+        if user_agent is None:
+            user_agent = generate_random_user_agent(device_type='android', browser_type='chrome')
+            self.store.update(self.session_name, user_agent=user_agent)
 
             logger.success(f"<light-yellow>{self.session_name}</light-yellow> | User agent saved successfully")
 
-            return user_agent_str
-
-    def load_user_agents(self):
-        user_agents_file_name = "user_agents.json"
-
-        try:
-            with open(user_agents_file_name, 'r') as user_agents:
-                session_data = json.load(user_agents)
-                if isinstance(session_data, list):
-                    return session_data
-
-        except FileNotFoundError:
-            logger.warning("User agents file not found, creating...")
-
-        except json.JSONDecodeError:
-            logger.warning("User agents file is empty or corrupted.")
+        return user_agent
 
-        return []
+    async def send_start_command(self, tg_client: 'Client') -> None:
+        start_command_found = False
 
-    def check_user_agent(self):
-        load = next(
-            (session['user_agent'] for session in self.session_ug_dict if session['session_name'] == self.session_name),
-            None)
+        if settings.START_HISTORY_CHECK_LIMIT > 0:
+            async for message in tg_client.get_chat_history('snapster_bot', limit=settings.START_HISTORY_CHECK_LIMIT):
+                if (message.text and message.text.startswith('/start')) or (
+                        message.caption and message.caption.startswith('/start')):
+                    start_command_found = True
+                    break
 
-        if load is None:
-            return self.save_user_agent()
+        if not start_command_found:
+            ref_id = settings.REF_ID or "ref_wjnV2yHU8MD0sL"
+            await tg_client.send_message("snapster_bot", f"/start {ref_id}")
 
-        return load
+        self.store.mark_started(self.session_name)
 
     async def get_tg_web_data(self, proxy: str | None) -> str:
+        from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered, FloodWait
+        from pyrogram.raw.functions.messages import RequestWebView
+
         if proxy:
             proxy = Proxy.from_str(proxy)
             proxy_dict = dict(
@@ -89,172 +99,173 @@ class Tapper:
         else:
             proxy_dict = None
 
-        self.tg_client.proxy = proxy_dict
-
         try:
-            if not self.tg_client.is_connected:
-                try:
-                    await self.tg_client.connect()
-                    start_command_found = False
-
-                    async for message in self.tg_client.get_chat_history('snapster_bot'):
-                        if (message.text and message.text.startswith('/start')) or (
-                                message.caption and message.caption.startswith('/start')):
-                            start_command_found = True
-                            break
-
-                    if not start_command_found:
-                        ref_id = settings.REF_ID or "ref_wjnV2yHU8MD0sL"
-                        await self.tg_client.send_message("snapster_bot", f"/start {ref_id}")
-                except (Unauthorized, UserDeactivated, AuthKeyUnregistered):
-                    raise InvalidSession(self.session_name)
-
-            while True:
-                try:
-                    peer = await self.tg_client.resolve_peer('snapster_bot')
-                    break
-                except FloodWait as fl:
-                    fls = fl.value
+            async with self.tg_clients.session(self.session_name, proxy=proxy_dict) as tg_client:
+                if not self.store.is_started(self.session_name) and not self.read_only:
+                    await asyncio.wait_for(self.send_start_command(tg_client), settings.TG_TIMEOUT)
 
-                    logger.warning(f"{self.session_name} | FloodWait {fl}")
-                    logger.info(f"{self.session_name} | Sleep {fls}s")
+                peer = await asyncio.wait_for(tg_client.resolve_peer('snapster_bot'), settings.TG_TIMEOUT)
 
-                    await asyncio.sleep(fls + 3)
+                web_view = await asyncio.wait_for(tg_client.invoke(RequestWebView(
+                    peer=peer,
+                    bot=peer,
+                    platform='android',
+                    from_bot_menu=False,
+                    url='https://snapster-lake.vercel.app/'
+                )), settings.TG_TIMEOUT)
 
-            web_view = await self.tg_client.invoke(RequestWebView(
-                peer=peer,
-                bot=peer,
-                platform='android',
-                from_bot_menu=False,
-                url='https://snapster-lake.vercel.app/'
-            ))
+                auth_url = web_view.url
+                tg_web_data = unquote(
+                    string=auth_url.split('tgWebAppData=', maxsplit=1)[1].split('&tgWebAppVersion', maxsplit=1)[0])
 
-            auth_url = web_view.url
-            tg_web_data = unquote(
-                string=auth_url.split('tgWebAppData=', maxsplit=1)[1].split('&tgWebAppVersion', maxsplit=1)[0])
-
-            self.user_id = (await self.tg_client.get_me()).id
-
-            if self.tg_client.is_connected:
-                await self.tg_client.disconnect()
+                self.user_id = (await asyncio.wait_for(tg_client.get_me(), settings.TG_TIMEOUT)).id
 
             return tg_web_data
 
+        except (Unauthorized, UserDeactivated, AuthKeyUnregistered):
+            raise InvalidSession(self.session_name)
+
         except InvalidSession as error:
             raise error
 
+        except FloodWait as fl:
+            # The client is released by now; the login is rescheduled instead of sleeping on a connection slot
+            metrics.flood_wait_seconds_total.inc(fl.value)
+            raise TelegramFloodWait(self.session_name, fl.value)
+
+        except asyncio.TimeoutError:
+            metrics.timeouts_total.inc(kind='telegram')
+            logger.warning(f"{self.session_name} | Telegram did not respond in {settings.TG_TIMEOUT}s "
+                           f"during Authorization")
+
         except Exception as error:
             escaped_error = str(error).replace('<', '&lt;').replace('>', '&gt;')
             logger.error(f"{self.session_name} | Unknown error during Authorization: {escaped_error}")
-            await asyncio.sleep(delay=3)
 
     async def make_request(self, http_client, method, endpoint=None, url=None, **kwargs):
-        full_url = url or f"https://prod.snapster.bot/api/{endpoint or ''}"
-        response = await http_client.request(method, full_url, **kwargs)
-        return response
-
-    async def get_stats(self, http_client: aiohttp.ClientSession):
+        full_url = url or f"{self.API_URL}/{endpoint or ''}"
+        if self.read_only and method.upper() != 'GET':
+            raise RuntimeError(f"{method} {endpoint or url} in read-only mode")
+        request_headers = {'User-Agent': self.user_agent, **kwargs.pop('headers', {})}
+        if self.tg_web_data:
+            request_headers['Telegram-Data'] = self.tg_web_data
+
+        endpoint_label = metrics.endpoint_label(endpoint or url)
+        # A POST that may have reached the server (claims, quest starts) is not sent twice
+        idempotent = method.upper() != 'POST'
+
+        for attempt in range(settings.REQUEST_RETRIES + 1):
+            await rate_limiter.acquire(self.proxy)
+            is_last_attempt = attempt == settings.REQUEST_RETRIES
+
+            metrics.in_flight_requests.inc()
+            started_at = time.perf_counter()
+            try:
+                response = await http_client.request(method, full_url, headers=request_headers, **kwargs)
+                if self.recorder is not None:
+                    self.recorder.record(self.session_name, method, full_url, kwargs.get('json'), started_at,
+                                         status=response.status, headers=response.headers, body=await response.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                if self.recorder is not None:
+                    self.recorder.record(self.session_name, method, full_url, kwargs.get('json'), started_at,
+                                         error=type(error).__name__)
+                timed_out = isinstance(error, asyncio.TimeoutError)
+                if timed_out:
+                    metrics.timeouts_total.inc(kind='http')
+                metrics.requests_total.inc(endpoint=endpoint_label, result='timeout' if timed_out else 'error',
+                                           status=type(error).__name__)
+                if self.proxy_pool is not None:
+                    self.proxy_pool.record(self.proxy, None, ok=False)
+                if not idempotent and not isinstance(error, aiohttp.ClientConnectorError):
+                    raise
+                if is_last_attempt or (self.proxy_pool is not None and not self.proxy_pool.is_healthy(self.proxy)):
+                    raise
+                reason = type(error).__name__
+                delay = get_backoff_delay(attempt)
+            else:
+                metrics.requests_total.inc(endpoint=endpoint_label, status=response.status,
+                                           result='success' if response.status < 400 else 'failure')
+                if self.proxy_pool is not None:
+                    self.proxy_pool.record(self.proxy, time.perf_counter() - started_at, ok=True)
+                if response.status in (401, 403):
+                    response.release()
+                    raise InvalidTgWebData(self.session_name)
+                if self.tg_web_data and not self.auth.confirmed and response.status < 400:
+                    self.auth.confirm()
+
+                retryable = response.status == 429 or (response.status >= 500 and idempotent)
+                if is_last_attempt or not retryable:
+                    return response
+
+                reason = f"HTTP {response.status}"
+                delay = get_retry_after(response.headers.get('Retry-After')) or get_backoff_delay(attempt)
+                if response.status == 429:
+                    rate_limiter.pause(self.proxy, delay)
+                response.release()
+            finally:
+                metrics.in_flight_requests.dec()
+                metrics.request_duration.observe(time.perf_counter() - started_at, endpoint=endpoint_label)
+
+            logger.bind(endpoint=endpoint_label).debug(
+                f"{self.session_name} | {endpoint_label} failed ({reason}), retry in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def get_stats(self, http_client: aiohttp.ClientSession) -> UserStats | None:
         try:
-            stats = await self.make_request(http_client, 'GET', f'user/getUserByTelegramId?telegramId={self.user_id}')
-            stats = await stats.json(content_type=None)
-            data = stats.get('data', {})
-            league = data.get('currentLeague', {})
-            balance = data.get('pointsCount', {})
-            leagueId = league.get('leagueId', {})
-            mining_speed = league.get('miningSpeed', {})
-            leagueName = league.get('title', {})
-            daily = data.get('dailyBonusStreakCount', {})
-            logger.info(f"{self.session_name} | Balance - <lc>{balance}</lc>, Daily streak - <lc>{daily}</lc> days")
-            logger.info(f"{self.session_name} | Mining speed - <lc>{mining_speed} / min</lc>, League - Name: {leagueName}, "
-                        f"ID: {leagueId}")
-
-            return daily
+            stats = await self.api.get_user_by_telegram_id(http_client, self.user_id)
+            league = stats.league
+            logger.info(f"{self.session_name} | Balance - <lc>{stats.points}</lc>, "
+                        f"Daily streak - <lc>{stats.daily_streak}</lc> days")
+            logger.info(f"{self.session_name} | Mining speed - <lc>{league.mining_speed} / min</lc>, "
+                        f"League - Name: {league.title}, ID: {league.id}")
+
+            return stats
 
         except Exception as error:
             logger.error(f"{self.session_name} | Get stats error: {error}")
-            return False
+            return None
 
     async def start_daily_streak(self, http_client: aiohttp.ClientSession):
         try:
-            resp_json = await self.make_request(http_client, 'POST', 'dailyQuest/startDailyBonusQuest',
-                                                json={'telegramId': str(self.user_id)})
-            resp_json = await resp_json.json(content_type=None)
-            if resp_json.get('result', {}) is False:
-                return False
-            return True
+            result = await self.api.start_daily_bonus_quest(http_client, self.user_id)
+            return result is not False
         except Exception as error:
             logger.error(f"{self.session_name} | Start daily tasks error: {error}")
-            return False
+            return None
 
     async def join_daily(self, http_client: aiohttp.ClientSession, days):
         try:
-            resp_json = await self.make_request(http_client, 'POST', 'dailyQuest/claimDailyQuestBonus',
-                                                json={'telegramId': str(self.user_id), 'dayCount': days+1})
-            resp_json = await resp_json.json(content_type=None)
-            if resp_json.get('result', {}) is True:
-                return True
-            return False
+            return await self.api.claim_daily_quest_bonus(http_client, self.user_id, day_count=days + 1) is True
         except Exception as error:
             logger.error(f"{self.session_name} | Join daily error: {error}")
 
     async def claim_mining(self, http_client: aiohttp.ClientSession):
         try:
-            resp_json = await self.make_request(http_client, 'POST', 'user/claimMiningBonus',
-                                                json={'telegramId': str(self.user_id)})
-            resp_json = await resp_json.json()
-            points = resp_json.get('data', {}).get('pointsClaimed', 0)
-            return points
+            return await self.api.claim_mining_bonus(http_client, self.user_id)
         except Exception as error:
             logger.error(f"{self.session_name} | Claim mining error: {error}")
 
     async def get_ref_points(self, http_client: aiohttp.ClientSession):
         try:
-            resp_json = await self.make_request(http_client, 'GET', f'referral/calculateReferralPoints'
-                                                                    f'?telegramId={self.user_id}')
-            resp_json = await resp_json.json(content_type=None)
-            return resp_json.get('data', {}).get('pointsToClaim', 0)
+            return await self.api.calculate_referral_points(http_client, self.user_id)
         except Exception as error:
             logger.error(f"{self.session_name} | RefPoints error: {error}")
 
     async def claim_ref_points(self, http_client: aiohttp.ClientSession):
         try:
-            resp_json = await self.make_request(http_client, 'POST', 'referral/claimReferralPoints',
-                                                json={'telegramId': str(self.user_id)})
-            resp_json = await resp_json.json(content_type=None)
-            if resp_json.get('result', {}) is True:
-                return True
-            return False
+            return await self.api.claim_referral_points(http_client, self.user_id) is True
         except Exception as error:
             logger.error(f"{self.session_name} | Claim ref points error:{error}")
 
-    async def get_quests(self, http_client: aiohttp.ClientSession):
+    async def get_quests(self, http_client: aiohttp.ClientSession) -> list[Quest] | None:
         try:
-            resp_json = await self.make_request(http_client, 'GET', f'quest/getQuests'
-                                                                    f'?telegramId={self.user_id}')
-            resp_json = await resp_json.json(content_type=None)
-            quests = []
-            data = resp_json.get('data', {})
-            if data:
-                for quest in data:
-                    quests.append(({
-                        'id': quest['id'],
-                        'title': quest['title'],
-                        'points': quest['bonusPoints']
-                    }))
-
-                return quests
-
+            return await self.api.get_quests(http_client, self.user_id)
         except Exception as error:
             logger.error(f"{self.session_name} | Get Quests error: {error}")
 
     async def start_quest(self, http_client: aiohttp.ClientSession, quest_id):
         try:
-            resp_json = await self.make_request(http_client, 'POST', 'quest/startQuest',
-                                                json={"telegramId": str(self.user_id),"questId": quest_id})
-            resp_json = await resp_json.json(content_type=None)
-            if resp_json.get('result', {}) is True:
-                return True
-            return False
+            return await self.api.start_quest(http_client, self.user_id, quest_id=quest_id) is True
 
         except ValueError:
             pass
@@ -264,12 +275,7 @@ class Tapper:
 
     async def claim_quest(self, http_client: aiohttp.ClientSession, quest_id):
         try:
-            resp_json = await self.make_request(http_client, 'POST', 'quest/claimQuestBonus',
-                                                json={'telegramId': str(self.user_id),"questId": quest_id})
-            resp_json = await resp_json.json(content_type=None)
-            if resp_json.get('result', {}) is True:
-                return True
-            return False
+            return await self.api.claim_quest_bonus(http_client, self.user_id, quest_id=quest_id) is True
 
         except ValueError:
             pass
@@ -277,102 +283,241 @@ class Tapper:
         except Exception as error:
             logger.error(f"{self.session_name} | Claim quest error: {error}")
 
-    async def check_proxy(self, http_client: aiohttp.ClientSession, proxy: Proxy) -> None:
+    def switch_proxy(self) -> bool:
+        """Move the account off its proxy once the pool has marked it dead."""
+        if self.proxy_pool is None or self.proxy_pool.is_healthy(self.proxy):
+            return False
+
+        proxy = self.proxy_pool.assign(self.session_name)
+        if proxy == self.proxy:
+            return False
+
+        logger.info(f"{self.session_name} | Proxy is unavailable, switching to another one")
+        self.proxy = proxy
+        self.http_client = self.http_pool.get(proxy)
+        return True
+
+    def get_next_cycle_time(self, stats: UserStats) -> float:
+        now = datetime.now(timezone.utc)
+        delay = settings.MAX_CYCLE_DELAY
+
+        mining_speed = stats.league.mining_speed
+        if settings.AUTO_MINING and mining_speed > 0:
+            claimed_at = self.store.get_claimed_at(self.session_name, 'mining') or now.timestamp()
+            delay = min(delay, claimed_at + settings.MINING_CLAIM_THRESHOLD / mining_speed * 60 - now.timestamp())
+
+        next_day = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        delay = min(delay, (next_day - now).total_seconds() + 60)
+
+        return now.timestamp() + max(delay, settings.MIN_CYCLE_DELAY)
+
+    def is_done_today(self, action: str) -> bool:
+        claimed_at = self.store.get_claimed_at(self.session_name, action)
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        return claimed_at is not None and claimed_at >= today.timestamp()
+
+    def is_done_within(self, action: str, interval: float) -> bool:
+        claimed_at = self.store.get_claimed_at(self.session_name, action)
+        return claimed_at is not None and time.time() - claimed_at < interval
+
+    def get_mining_accrued(self) -> float | None:
+        """Points mined since the last claim, estimated from the mining speed of the last stats."""
+        claimed_at = self.store.get_claimed_at(self.session_name, 'mining')
+        last_stats = self.store.get(self.session_name).get('last_stats')
+        if claimed_at is None or not last_stats:
+            return None
+
+        return (time.time() - claimed_at) / 60 * last_stats['league']['mining_speed']
+
+    def skip(self, step: str) -> None:
+        metrics.steps_skipped_total.inc(step=step)
+        logger.debug(f"{self.session_name} | Skipped <ly>{step}</ly>, nothing to do")
+
+    async def dispatch(self, action: str) -> dict[str, float]:
+        actions = {
+            'login': self.login,
+            'farm': self.farm,
+        }
+        self.switch_proxy()
+
+        if action != 'login' and self.auth.confirmed and not self.store.get_tg_web_data(self.session_name):
+            logger.info(f"{self.session_name} | Web app data expired, re-authorizing")
+            self.auth.expire()
+            action = 'login'
+
         try:
-            response = await http_client.get(url='https://httpbin.org/ip', timeout=aiohttp.ClientTimeout(5))
-            ip = (await response.json()).get('origin', {})
-            logger.info(f"{self.session_name} | Proxy IP: {ip}")
-        except Exception as error:
-            escaped_error = str(error).replace('<', '&lt;').replace('>', '&gt;')
-            logger.error(f"{self.session_name} | Proxy: {proxy} | Error: {escaped_error}")
-
-    async def run(self, proxy: str | None) -> None:
-        proxy_conn = ProxyConnector().from_url(proxy) if proxy else None
-
-        async with CloudflareScraper(headers=headers, connector=proxy_conn) as http_client:
-            if proxy:
-                await self.check_proxy(http_client=http_client, proxy=proxy)
-
-            tg_web_data = await self.get_tg_web_data(proxy=proxy)
-
-            http_client.headers['Telegram-Data'] = f"{tg_web_data}"
-            http_client.headers['User-Agent'] = generate_random_user_agent(device_type='android',
-                                                                           browser_type='chrome')
-
-            while True:
-                try:
-                    if not tg_web_data:
-                        continue
-                    else:
-                        if not self.first_run:
-                            logger.success(
-                                f"{self.session_name} | Logged in")
-                            self.first_run = True
-
-                    daily_streak = await self.get_stats(http_client=http_client)
-
-                    await asyncio.sleep(2)
-
-                    streak_status = await self.start_daily_streak(http_client=http_client)
-                    if streak_status:
-                        logger.success(f"{self.session_name} | Daily streak started")
-                    else:
-                        logger.info(f"{self.session_name} | Can`t start daily streak, already started")
-
-                    if daily_streak:
-                        status = await self.join_daily(http_client=http_client, days=daily_streak)
-                        if status:
-                            logger.success(f"{self.session_name} | Daily joined, got points")
-
-                    await asyncio.sleep(2)
-
-                    if settings.AUTO_MINING:
-                        points = await self.claim_mining(http_client=http_client)
-                        if points and points > 1:
-                            logger.success(f'{self.session_name} | Successfully mined <lc>{points}</lc> points')
-
-                    await asyncio.sleep(2)
-
-                    if settings.CLAIM_REF_POINTS:
-                        ref_points = await self.get_ref_points(http_client)
-                        if ref_points and ref_points > 0:
-                            status = await self.claim_ref_points(http_client=http_client)
-                            if status:
-                                logger.success(f"{self.session_name} | Points from referrals claimed, got - <lc>{ref_points}</lc>")
-
-                    await asyncio.sleep(2)
-
-                    if settings.AUTO_QUEST:
-                        try:
-                            quests = await self.get_quests(http_client)
-                            for quest in quests:
-                                id = quest['id']
-                                title = quest['title']
-                                points = quest['points']
-                                await self.start_quest(http_client=http_client, quest_id=id)
-                                await asyncio.sleep(.1)
-                                status = await self.claim_quest(http_client=http_client, quest_id=id)
-                                if status:
-                                    logger.success(f'{self.session_name} | Successfully done quest - <ly>"{title}"</ly>, '
-                                                   f'got <lc>{points}</lc> points')
-                                await asyncio.sleep(.1)
-                        except Exception:
-                            pass
-
-                    logger.info(f"{self.session_name} | Going sleep 1h")
-
-                    await asyncio.sleep(delay=3600)
-
-                except InvalidSession as error:
-                    raise error
-
-                except Exception as error:
-                    logger.error(f"{self.session_name} | Unknown error: {error}")
-                    await asyncio.sleep(delay=3)
-
-
-async def run_tapper(tg_client: Client, proxy: str | None):
-    try:
-        await Tapper(tg_client=tg_client).run(proxy=proxy)
-    except InvalidSession:
-        logger.error(f"{tg_client.name} | Invalid Session")
+            with profiler.span(action):
+                return await actions[action]()
+        except InvalidTgWebData:
+            self.store.invalidate_tg_web_data(self.session_name)
+            self.tg_web_data = None
+            due = self.auth.reject()
+            if self.auth.state is AuthState.UNAUTHENTICATED:
+                logger.warning(f"{self.session_name} | Web app data rejected, re-authorizing")
+            return {'login': due}
+
+    async def login(self) -> dict[str, float]:
+        self.auth.begin()
+        cached = self.store.get_tg_web_data(self.session_name)
+        if cached:
+            self.tg_web_data, self.user_id = cached
+        else:
+            try:
+                with profiler.span('auth'):
+                    tg_web_data = await self.get_tg_web_data(proxy=self.proxy)
+            except TelegramFloodWait as error:
+                return {'login': self.auth.flood_wait(error.seconds)}
+            if not tg_web_data:
+                return {'login': self.auth.fail("no web app data from Telegram")}
+
+            self.tg_web_data = tg_web_data
+            self.store.set_tg_web_data(self.session_name, tg_web_data=tg_web_data, user_id=self.user_id)
+
+        self.auth.succeed(fresh=not cached)
+
+        if not self.first_run:
+            logger.success(f"{self.session_name} | Logged in")
+            self.first_run = True
+
+        return {'farm': time.time()}
+
+    async def step_stats(self, results: dict) -> dict | None:
+        return await self.get_stats(http_client=self.http_client)
+
+    async def step_streak(self, results: dict) -> bool:
+        streak_status = await self.start_daily_streak(http_client=self.http_client)
+        if streak_status is not None:
+            self.store.set_claimed_at(self.session_name, 'streak')
+
+        if streak_status:
+            logger.success(f"{self.session_name} | Daily streak started")
+        else:
+            logger.info(f"{self.session_name} | Can`t start daily streak, already started")
+
+        return streak_status
+
+    async def step_daily(self, results: dict) -> None:
+        stats = results.get('stats')
+        daily_streak = stats.daily_streak if stats else None
+
+        if daily_streak:
+            status = await self.join_daily(http_client=self.http_client, days=daily_streak)
+            if status is not None:
+                self.store.set_claimed_at(self.session_name, 'daily')
+            if status:
+                metrics.claims_total.inc(action='daily')
+                logger.success(f"{self.session_name} | Daily joined, got points")
+
+    async def step_mining(self, results: dict) -> None:
+        points = await self.claim_mining(http_client=self.http_client)
+        if points is not None:
+            self.store.set_claimed_at(self.session_name, 'mining')
+        if points:
+            metrics.claims_total.inc(action='mining')
+            metrics.points_claimed_total.inc(points, action='mining')
+        if points and points > 1:
+            logger.success(f'{self.session_name} | Successfully mined <lc>{points}</lc> points')
+
+    async def step_refs(self, results: dict) -> None:
+        ref_points = await self.get_ref_points(self.http_client)
+        if ref_points is not None:
+            self.store.set_claimed_at(self.session_name, 'refs')
+
+        if ref_points and ref_points > 0:
+            status = await self.claim_ref_points(http_client=self.http_client)
+            if status:
+                metrics.claims_total.inc(action='refs')
+                metrics.points_claimed_total.inc(ref_points, action='refs')
+                logger.success(f"{self.session_name} | Points from referrals claimed, got - <lc>{ref_points}</lc>")
+
+    async def step_quests(self, results: dict) -> None:
+        http_client = self.http_client
+
+        try:
+            quests = await self.quest_catalogue.get(lambda: self.get_quests(http_client))
+            completed_quests = self.store.get_completed_quests(self.session_name)
+            for quest in quests:
+                id = quest.id
+                title = quest.title
+                points = quest.points
+                if id in completed_quests or self.store.is_quest_parked(self.session_name, id):
+                    continue
+
+                await self.start_quest(http_client=http_client, quest_id=id)
+                await asyncio.sleep(settings.QUEST_DELAY)
+                status = await self.claim_quest(http_client=http_client, quest_id=id)
+                if status:
+                    metrics.claims_total.inc(action='quests')
+                    metrics.points_claimed_total.inc(points, action='quests')
+                    logger.success(f'{self.session_name} | Successfully done quest - <ly>"{title}"</ly>, '
+                                   f'got <lc>{points}</lc> points')
+
+                if status:
+                    self.store.add_completed_quest(self.session_name, id)
+                    self.store.clear_quest_failures(self.session_name, id)
+                elif status is False and self.store.record_quest_failure(self.session_name, id):
+                    logger.info(f'{self.session_name} | Quest <ly>"{title}"</ly> was not accepted '
+                                f'{settings.QUEST_MAX_ATTEMPTS} times, retry in {settings.QUEST_PARK_TIME}s')
+                await asyncio.sleep(settings.QUEST_DELAY)
+        except Exception:
+            pass
+
+    async def farm(self) -> dict[str, float]:
+        executor = StepExecutor(limit=settings.ACCOUNT_CONCURRENCY, delay=settings.STEP_DELAY,
+                                timeout=settings.CYCLE_TIMEOUT or None,
+                                timer=profiler.record if profiler.enabled else None)
+        executor.add('stats', self.step_stats)
+        skip_done = settings.SKIP_DONE_STEPS
+
+        if skip_done and self.is_done_today('streak'):
+            self.skip('streak')
+            daily_after = ('stats',)
+        else:
+            executor.add('streak', self.step_streak)
+            daily_after = ('stats', 'streak')
+
+        if skip_done and self.is_done_today('daily'):
+            self.skip('daily')
+        else:
+            executor.add('daily', self.step_daily, after=daily_after)
+
+        if settings.AUTO_MINING:
+            accrued = self.get_mining_accrued() if skip_done else None
+            if accrued is not None and accrued < settings.MINING_CLAIM_THRESHOLD:
+                self.skip('mining')
+            else:
+                executor.add('mining', self.step_mining)
+
+        if settings.CLAIM_REF_POINTS:
+            if skip_done and self.is_done_within('refs', settings.REFS_CHECK_INTERVAL):
+                self.skip('refs')
+            else:
+                executor.add('refs', self.step_refs)
+
+        if settings.AUTO_QUEST:
+            executor.add('quests', self.step_quests)
+
+        results = await executor.run()
+        stats = results.get('stats')
+
+        if executor.timed_out:
+            metrics.timeouts_total.inc(len(executor.timed_out), kind='step')
+            logger.warning(f"{self.session_name} | Cycle deadline of {settings.CYCLE_TIMEOUT}s reached, "
+                           f"unfinished steps: <ly>{', '.join(executor.timed_out)}</ly>")
+        metrics.cycles_total.inc()
+
+        next_run = self.get_next_cycle_time(stats or UserStats())
+        self.store.update(self.session_name, last_stats=asdict(stats) if stats else None, last_run_at=time.time())
+
+        if self.switch_proxy():
+            return {'farm': time.time()}
+
+        logger.info(f"{self.session_name} | Next cycle at {datetime.fromtimestamp(next_run):%H:%M:%S}")
+
+        return {'farm': next_run}
+
+    async def close(self) -> None:
+        self.tg_web_data = None
+        self.auth.close()
+        if self.proxy_pool is not None:
+            self.proxy_pool.release(self.session_name)
@@ -0,0 +1,193 @@
+import asyncio
+import os
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Callable
+
+from bot.config import settings
+from bot.utils import logger, metrics
+
+if TYPE_CHECKING:
+    from pyrogram import Client
+
+
+class TgClientManager:
+    """Pyrogram clients of the process with a bounded number of live MTProto connections.
+
+    At most ``TG_MAX_CONNECTIONS`` clients (``TG_MAX_CONNECTIONS_PER_DC`` per Telegram DC)
+    are connected at once. A client stays connected after use so that the next re-auth is
+    cheap; when a limit is hit the least recently used idle client is disconnected, and if
+    every client is busy callers wait in FIFO order. Clients idle for longer than
+    ``TG_CLIENT_IDLE_TIMEOUT`` sec are disconnected in the background.
+    """
+
+    def __init__(self, factory: Callable[[str], 'Client'], workdir: str = "sessions"):
+        self.factory = factory
+        self.workdir = workdir
+        self._clients: dict[str, 'Client | None'] = {}
+        self._dc_ids: dict[str, int] = {}
+        self._idle: OrderedDict[str, float] = OrderedDict()
+        self._waiters: deque[tuple[str, int, asyncio.Future]] = deque()
+        self._reaper: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._reaper = asyncio.create_task(self._evict_idle_periodically())
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+
+        clients = [client for client in self._clients.values() if client is not None]
+        self._clients.clear()
+        self._idle.clear()
+        await asyncio.gather(*(self._disconnect(client) for client in clients))
+        self._update_metrics()
+
+    def get_dc_id(self, session_name: str) -> int:
+        """DC of the session read from its session file, 0 if unknown."""
+        dc_id = self._dc_ids.get(session_name)
+        if dc_id is None:
+            path = os.path.abspath(os.path.join(self.workdir, f"{session_name}.session"))
+            try:
+                connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+                try:
+                    row = connection.execute("SELECT dc_id FROM sessions").fetchone()
+                finally:
+                    connection.close()
+                dc_id = row[0] if row else 0
+            except sqlite3.Error:
+                dc_id = 0
+            self._dc_ids[session_name] = dc_id
+
+        return dc_id
+
+    def _count_dc(self, dc_id: int) -> int:
+        return sum(1 for session_name in self._clients if self._dc_ids.get(session_name) == dc_id)
+
+    def _reserve(self, session_name: str, dc_id: int) -> list['Client'] | None:
+        """Take a connection slot for the session, evicting idle clients if needed.
+
+        Returns the evicted clients to disconnect, or None if no slot can be freed now.
+        """
+        evicted = []
+        while True:
+            dc_full = bool(dc_id and settings.TG_MAX_CONNECTIONS_PER_DC
+                           and self._count_dc(dc_id) >= settings.TG_MAX_CONNECTIONS_PER_DC)
+            total_full = len(self._clients) >= settings.TG_MAX_CONNECTIONS
+            if not dc_full and not total_full:
+                self._clients[session_name] = None
+                return evicted
+
+            candidate = next((name for name in self._idle if not dc_full or self._dc_ids.get(name) == dc_id), None)
+            if candidate is None:
+                self._disconnect_later(evicted)
+                return None
+
+            del self._idle[candidate]
+            evicted.append(self._clients.pop(candidate))
+
+    def _disconnect_later(self, clients: list['Client']) -> None:
+        for client in clients:
+            asyncio.create_task(self._disconnect(client))
+
+    def _wake(self) -> None:
+        for waiter in list(self._waiters):
+            session_name, dc_id, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+                continue
+
+            evicted = self._reserve(session_name, dc_id)
+            if evicted is not None:
+                self._waiters.remove(waiter)
+                future.set_result(evicted)
+
+    async def _disconnect(self, client: 'Client | None') -> None:
+        if client is None or not client.is_connected:
+            return
+
+        try:
+            await asyncio.wait_for(client.disconnect(), settings.TG_TIMEOUT)
+        except Exception as error:
+            logger.debug(f"{client.name} | Disconnect error: {error}")
+
+    async def _release(self, session_name: str, keep: bool) -> None:
+        client = self._clients.get(session_name)
+        if keep and client is not None and client.is_connected:
+            self._idle[session_name] = time.time()
+            self._idle.move_to_end(session_name)
+        else:
+            self._clients.pop(session_name, None)
+            self._idle.pop(session_name, None)
+            await self._disconnect(client)
+
+        self._wake()
+        self._update_metrics()
+
+    async def acquire(self, session_name: str, proxy: dict | None) -> 'Client':
+        if session_name in self._idle:
+            del self._idle[session_name]
+            client = self._clients[session_name]
+            if client.proxy == proxy:
+                return client
+            await self._disconnect(client)
+        elif session_name in self._clients:
+            raise RuntimeError(f"{session_name} | Telegram client is already in use")
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((session_name, self.get_dc_id(session_name), future))
+            self._wake()
+            try:
+                evicted = await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._disconnect_later(future.result())
+                    await self._release(session_name, keep=False)
+                raise
+
+            await asyncio.gather(*(self._disconnect(client) for client in evicted))
+
+        try:
+            client = self._clients.get(session_name) or self.factory(session_name)
+            client.proxy = proxy
+            self._clients[session_name] = client
+            await asyncio.wait_for(client.connect(), settings.TG_TIMEOUT)
+        except BaseException:
+            await self._release(session_name, keep=False)
+            raise
+
+        self._update_metrics()
+        return client
+
+    async def discard(self, session_name: str) -> None:
+        """Disconnect the warm client of an account this process no longer runs."""
+        if session_name in self._idle:
+            await self._release(session_name, keep=False)
+
+    @asynccontextmanager
+    async def session(self, session_name: str, proxy: dict | None):
+        """Connected client of the session; it is kept warm afterwards unless the block failed."""
+        client = await self.acquire(session_name, proxy)
+        keep = False
+        try:
+            yield client
+            keep = True
+        finally:
+            await self._release(session_name, keep=keep)
+
+    async def _evict_idle_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(min(settings.TG_CLIENT_IDLE_TIMEOUT, 30))
+
+            expired_at = time.time() - settings.TG_CLIENT_IDLE_TIMEOUT
+            expired = [session_name for session_name, released_at in self._idle.items() if released_at <= expired_at]
+            for session_name in expired:
+                if session_name in self._idle:
+                    await self._release(session_name, keep=False)
+
+    def _update_metrics(self) -> None:
+        metrics.tg_connections.set(sum(client is not None and client.is_connected
+                                       for client in self._clients.values()))
@@ -1,2 +1,12 @@
 class InvalidSession(BaseException):
     ...
+
+
+class InvalidTgWebData(BaseException):
+    ...
+
+
+class TelegramFloodWait(BaseException):
+    def __init__(self, session_name: str, seconds: float):
+        super().__init__(session_name, seconds)
+        self.seconds = seconds
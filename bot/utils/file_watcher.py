@@ -0,0 +1,138 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+from typing import AsyncIterator, Callable
+
+from bot.utils import logger
+
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+IN_Q_OVERFLOW = 0x4000
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def open_inotify(directories: list[str]) -> tuple[int, dict[int, str]] | None:
+    """inotify descriptor watching ``directories`` and the directory of each watch,
+    or None where inotify is not available."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+
+    if fd < 0:
+        return None
+
+    watches = {}
+    for directory in directories:
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            return None
+        watches[wd] = directory
+
+    return fd, watches
+
+
+def parse_events(data: bytes, watches: dict[int, str]) -> list[tuple[str, int]]:
+    """``(path, mask)`` of every event in a read from an inotify descriptor."""
+    events = []
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+        offset += length
+        directory = watches.get(wd, '')
+        events.append((os.path.join(directory, name) if name else directory, mask))
+
+    return events
+
+
+def get_snapshot(directories: list[str]) -> dict[str, tuple[int, float]]:
+    snapshot = {}
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_ino, stat.st_mtime)
+        except FileNotFoundError:
+            pass
+
+    return snapshot
+
+
+def diff_snapshots(old: dict[str, tuple[int, float]], new: dict[str, tuple[int, float]]) -> list[tuple[str, int]]:
+    """The changes between two snapshots as inotify-like ``(path, mask)`` events."""
+    events = [(path, IN_DELETE) for path in old if path not in new]
+    for path, (inode, mtime) in new.items():
+        if path not in old or old[path][0] != inode:
+            events.append((path, IN_CREATE))
+        elif old[path][1] != mtime:
+            events.append((path, IN_MODIFY))
+
+    return events
+
+
+async def watch_files(directories: list[str], poll_interval: float, debounce: float = 1,
+                      ignore: Callable[[str, int], bool] | None = None) -> AsyncIterator[set[str]]:
+    """Yield the paths changed in ``directories``, using inotify on Linux and polling elsewhere.
+
+    Events arriving within ``debounce`` sec of each other are merged into one. Events for which
+    ``ignore(path, mask)`` is true are dropped, e.g. files the bot writes itself.
+    """
+    def select(events: list[tuple[str, int]]) -> set[str]:
+        return {path for path, mask in events if ignore is None or mask & IN_Q_OVERFLOW or not ignore(path, mask)}
+
+    inotify = open_inotify(directories)
+
+    if inotify is None:
+        logger.debug(f"inotify is not available, polling {', '.join(directories)} every {poll_interval}s")
+        snapshot = get_snapshot(directories)
+        while True:
+            await asyncio.sleep(poll_interval)
+            current = get_snapshot(directories)
+            changed = select(diff_snapshots(snapshot, current))
+            snapshot = current
+            if changed:
+                yield changed
+
+    fd, watches = inotify
+    loop = asyncio.get_running_loop()
+    readable = asyncio.Event()
+    loop.add_reader(fd, readable.set)
+
+    def drain() -> set[str]:
+        changed = set()
+        try:
+            while data := os.read(fd, 65536):
+                changed |= select(parse_events(data, watches))
+        except BlockingIOError:
+            pass
+
+        return changed
+
+    try:
+        while True:
+            await readable.wait()
+            changed = set()
+            while readable.is_set():
+                readable.clear()
+                changed |= drain()
+                await asyncio.sleep(debounce)
+            changed |= drain()
+            if changed:
+                yield changed
+    finally:
+        loop.remove_reader(fd)
+        os.close(fd)
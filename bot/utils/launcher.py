@@ -1,16 +1,31 @@
 import os
-import glob
+import time
+import signal
 import asyncio
 import argparse
-from itertools import cycle
+from typing import TYPE_CHECKING, Callable
 
-from pyrogram import Client
 from better_proxy import Proxy
 
 from bot.config import settings
-from bot.utils import logger
-from bot.core.tapper import run_tapper
-from bot.core.registrator import register_sessions
+from bot.utils import logger, metrics
+from bot.utils.logger import error_counts
+from bot.core.tapper import Tapper
+from bot.core.scheduler import Scheduler
+from bot.core.http_pool import HttpClientPool
+from bot.core.proxy_pool import ProxyPool
+from bot.core.recorder import HttpRecorder
+from bot.core.leases import LeaseCoordinator, SqliteLeaseStore, get_node_id
+from bot.core.tg_clients import TgClientManager
+from bot.core.state_store import StateStore
+from bot.core.quests import QuestCatalogue
+from bot.utils.workers import run_workers
+from bot.utils.sweep import run_sweep
+from bot.utils.file_watcher import watch_files, IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO
+from bot.utils.profiler import profiler
+
+if TYPE_CHECKING:
+    from pyrogram import Client
 
 
 start_text = """
@@ -28,17 +43,17 @@ Select an action:
 
     1. Run clicker
     2. Create session
+    3. Status sweep (read-only)
 """
 
-global tg_clients
 
 def get_session_names() -> list[str]:
-    session_names = glob.glob("sessions/*.session")
-    session_names = [
-        os.path.splitext(os.path.basename(file))[0] for file in session_names
-    ]
-
-    return session_names
+    try:
+        with os.scandir("sessions") as entries:
+            return sorted(entry.name.removesuffix(".session") for entry in entries
+                          if entry.name.endswith(".session") and entry.is_file())
+    except FileNotFoundError:
+        return []
 
 
 def get_proxies() -> list[Proxy]:
@@ -51,38 +66,57 @@ def get_proxies() -> list[Proxy]:
     return proxies
 
 
-async def get_tg_clients() -> list[Client]:
-    global tg_clients
+def make_tg_client(session_name: str) -> 'Client':
+    from pyrogram import Client
+
+    return Client(
+        name=session_name,
+        api_id=settings.API_ID,
+        api_hash=settings.API_HASH,
+        workdir="sessions/",
+        plugins=dict(root="bot/plugins"),
+    )
 
-    session_names = get_session_names()
 
+def check_run_settings(session_names: list[str]) -> None:
     if not session_names:
         raise FileNotFoundError("Not found session files")
 
     if not settings.API_ID or not settings.API_HASH:
         raise ValueError("API_ID and API_HASH not found in the .env file.")
 
-    tg_clients = [
-        Client(
-            name=session_name,
-            api_id=settings.API_ID,
-            api_hash=settings.API_HASH,
-            workdir="sessions/",
-            plugins=dict(root="bot/plugins"),
-        )
-        for session_name in session_names
-    ]
 
-    return tg_clients
+def is_session_write(path: str, mask: int) -> bool:
+    """Pyrogram rewrites ``.session`` files (VACUUM on every connect) through SQLite journals,
+    so only created, moved and deleted session files are changes made by the user."""
+    name = os.path.basename(path)
+    if '.session-' in name:
+        return True
+
+    return name.endswith('.session') and not mask & (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO)
+
+
+def get_startup_delay(index: int) -> float:
+    """Accounts log in by waves of ``STARTUP_WAVE_SIZE`` every ``STARTUP_WAVE_INTERVAL`` sec."""
+    if settings.STARTUP_WAVE_SIZE <= 0:
+        return 0
+    return index // settings.STARTUP_WAVE_SIZE * settings.STARTUP_WAVE_INTERVAL
 
 
 async def process() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--action", type=int, help="Action to perform")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("-o", "--output", default="status.csv", help="Status sweep output, .csv or .jsonl")
+    parser.add_argument("--profile", nargs="?", const="profile", metavar="DIR",
+                        help="Write step timings, a CPU profile and slow callbacks to DIR (default - profile)")
 
-    logger.info(f"Detected {len(get_session_names())} sessions | {len(get_proxies())} proxies")
+    session_names = get_session_names()
+    proxies = get_proxies()
+    logger.info(f"Detected {len(session_names)} sessions | {len(proxies)} proxies")
 
-    action = parser.parse_args().action
+    args = parser.parse_args()
+    action = args.action
 
     if not action:
         print(start_text)
@@ -92,31 +126,277 @@ async def process() -> None:
 
             if not action.isdigit():
                 logger.warning("Action must be number")
-            elif action not in ["1", "2"]:
-                logger.warning("Action must be 1 or 2")
+            elif action not in ["1", "2", "3"]:
+                logger.warning("Action must be 1, 2 or 3")
             else:
                 action = int(action)
                 break
 
     if action == 2:
+        from bot.core.registrator import register_sessions
+
         await register_sessions()
     elif action == 1:
-        tg_clients = await get_tg_clients()
+        check_run_settings(session_names)
 
-        await run_tasks(tg_clients=tg_clients)
+        if args.workers > 1:
+            await run_workers(session_names=session_names, proxies=proxies, workers=args.workers,
+                              profile=args.profile)
+        else:
+            await run_tasks(session_names=session_names, proxies=proxies, profile=args.profile)
+    elif action == 3:
+        check_run_settings(session_names)
 
-
-async def run_tasks(tg_clients: list[Client]):
-    proxies = get_proxies()
-    proxies_cycle = cycle(proxies) if proxies else None
-    tasks = [
-        asyncio.create_task(
-            run_tapper(
-                tg_client=tg_client,
-                proxy=next(proxies_cycle) if proxies_cycle else None,
-            )
-        )
-        for tg_client in tg_clients
-    ]
-
-    await asyncio.gather(*tasks)
+        await run_sweep(session_names=session_names, proxies=proxies, output=args.output)
+
+
+async def report_summaries(scheduler: Scheduler, report: Callable[[dict], None]) -> None:
+    while True:
+        await asyncio.sleep(settings.WORKER_SUMMARY_INTERVAL)
+        report(scheduler.summary())
+
+
+def get_fleet_counters() -> dict[str, float]:
+    counters = {'cycles': metrics.cycles_total.values().get((), 0),
+                'skipped': sum(metrics.steps_skipped_total.values().values())}
+
+    for (action,), points in metrics.points_claimed_total.values().items():
+        counters[f'points:{action}'] = points
+
+    for (kind,), count in metrics.timeouts_total.values().items():
+        counters[f'timeout:{kind}'] = count
+
+    for (endpoint, result, status), count in metrics.requests_total.values().items():
+        if result not in ('success', 'timeout'):
+            key = f'error:HTTP {status}' if status.isdigit() else f'error:{status}'
+            counters[key] = counters.get(key, 0) + count
+
+    for error_type, count in error_counts.items():
+        counters[f'error:{error_type}'] = counters.get(f'error:{error_type}', 0) + count
+
+    return counters
+
+
+async def log_fleet_summaries(scheduler: Scheduler) -> None:
+    previous = get_fleet_counters()
+
+    while True:
+        await asyncio.sleep(settings.LOG_SUMMARY_INTERVAL)
+
+        current = get_fleet_counters()
+        delta = {key: value - previous.get(key, 0) for key, value in current.items() if value != previous.get(key, 0)}
+        previous = current
+
+        points = ', '.join(f"{key.split(':', 1)[1]} <lc>{value:g}</lc>"
+                           for key, value in delta.items() if key.startswith('points:')) or 'none'
+        errors = ', '.join(f"{key.split(':', 1)[1]} <lr>{value:g}</lr>"
+                           for key, value in sorted(delta.items()) if key.startswith('error:')) or 'none'
+        timeouts = ', '.join(f"{key.split(':', 1)[1]} <ly>{value:g}</ly>"
+                             for key, value in sorted(delta.items()) if key.startswith('timeout:')) or 'none'
+
+        logger.info(f"Fleet summary: accounts <lc>{scheduler.summary()['accounts']}</lc>, "
+                    f"cycled <lc>{delta.get('cycles', 0):g}</lc>, skipped steps <lc>{delta.get('skipped', 0):g}</lc>, "
+                    f"points claimed: {points}, errors: {errors}, timeouts: {timeouts}")
+
+
+def schedule_restored(scheduler: Scheduler, store: StateStore, make_tapper: Callable[[str], Tapper],
+                      session_names: list[str]) -> None:
+    """Resume every account at the time checkpointed on the last shutdown.
+
+    Accounts start with a login, which reuses the cached web app data. Overdue and new
+    accounts are started in waves like on a first run.
+    """
+    now = time.time()
+    overdue = 0
+    restored = 0
+    for session_name in session_names:
+        next_run = store.get_next_run(session_name)
+        if next_run is not None and next_run[1] > now:
+            due = next_run[1]
+            restored += 1
+        else:
+            due = now + get_startup_delay(overdue)
+            overdue += 1
+
+        scheduler.add(make_tapper(session_name), 'login', due=due)
+
+    if restored:
+        logger.info(f"Restored schedule of <lc>{restored}</lc> accounts, <lc>{overdue}</lc> start now")
+
+
+async def reload_on_changes(scheduler: Scheduler, proxy_pool: ProxyPool, http_pool: HttpClientPool,
+                            tg_clients: TgClientManager, make_tapper: Callable[[str], Tapper], session_names: list[str],
+                            manage_sessions: bool = True) -> None:
+    """Start new sessions, stop removed ones and move accounts off removed proxies as the files change.
+
+    Without ``manage_sessions`` only proxies are reloaded, as sessions come and go through leases.
+    """
+    started = set(session_names)
+
+    async for changed in watch_files(["sessions", "bot/config"], poll_interval=settings.RELOAD_POLL_INTERVAL,
+                                     ignore=is_session_write):
+        try:
+            session_names = get_session_names()
+            proxies = get_proxies()
+        except (OSError, ValueError) as error:
+            logger.warning(f"Reload skipped | {error}")
+            continue
+
+        removed_proxies = await proxy_pool.update(proxies)
+        moved = 0
+        for proxy, proxy_session_names in removed_proxies.items():
+            http_pool.discard(proxy)
+            for session_name in proxy_session_names:
+                tapper = scheduler.get(session_name)
+                if tapper is not None and tapper.switch_proxy():
+                    moved += 1
+
+        if not manage_sessions:
+            if removed_proxies:
+                logger.info(f"Reloaded | Proxies: <lc>{len(proxies)}</lc> (<lr>-{len(removed_proxies)}</lr>), "
+                            f"accounts moved to other proxies: <lc>{moved}</lc>")
+            continue
+
+        on_disk = set(session_names)
+        removed = [session_name for session_name in started if session_name not in on_disk]
+        for session_name in removed:
+            started.discard(session_name)
+            await scheduler.cancel(session_name)
+            await tg_clients.discard(session_name)
+
+        # A retired (e.g. invalid) session is started again only once its file has been replaced
+        replaced = {os.path.basename(path).removesuffix(".session") for path in changed
+                    if os.path.dirname(path) == "sessions"}
+        added = [session_name for session_name in session_names if scheduler.get(session_name) is None
+                 and (session_name not in started or session_name in replaced)]
+        now = time.time()
+        for index, session_name in enumerate(added):
+            started.add(session_name)
+            scheduler.add(make_tapper(session_name), 'login', due=now + get_startup_delay(index))
+
+        if added or removed or removed_proxies:
+            logger.info(f"Reloaded | Sessions: <lc>+{len(added)}</lc> / <lr>-{len(removed)}</lr>, "
+                        f"proxies: <lc>{len(proxies)}</lc> (<lr>-{len(removed_proxies)}</lr>), "
+                        f"accounts moved to other proxies: <lc>{moved}</lc>")
+
+
+async def run_tasks(session_names: list[str], proxies: list[str], report: Callable[[dict], None] | None = None,
+                    metrics_port: int | None = None, hot_reload: bool = True, profile: str | None = None):
+    if profile:
+        profiler.start(profile)
+
+    metrics_port = settings.METRICS_PORT if metrics_port is None else metrics_port
+    metrics_runner = None
+    loop_lag_monitor = None
+    if metrics_port:
+        metrics_runner = await metrics.start_metrics_server(settings.METRICS_HOST, metrics_port)
+        loop_lag_monitor = asyncio.create_task(metrics.monitor_event_loop_lag())
+        logger.info(f"Metrics available at http://{settings.METRICS_HOST}:{metrics_port}/metrics")
+
+    scheduler = Scheduler(max_in_flight=settings.MAX_CONCURRENT_ACTIONS)
+    http_pool = HttpClientPool()
+    store = StateStore()
+    await store.start()
+    quest_catalogue = QuestCatalogue()
+    proxy_pool = ProxyPool(proxies, http_pool=http_pool, store=store)
+    await proxy_pool.start()
+    tg_clients = TgClientManager(make_tg_client)
+    tg_clients.start()
+    recorder = HttpRecorder(settings.HTTP_RECORD_FILE) if settings.HTTP_RECORD_FILE else None
+
+    def make_tapper(session_name: str) -> Tapper:
+        return Tapper(session_name, tg_clients=tg_clients, http_pool=http_pool, store=store,
+                      quest_catalogue=quest_catalogue, proxy_pool=proxy_pool, recorder=recorder)
+
+    coordinator = None
+    if settings.LEASE_STORE:
+        async def start_accounts(lease_session_names: list[str]) -> None:
+            await store.refresh(lease_session_names)
+            schedule_restored(scheduler, store, make_tapper, lease_session_names)
+
+        async def stop_accounts(lease_session_names: list[str]) -> None:
+            # The next owner resumes the saved schedule, running actions start over there
+            pending = scheduler.pending()
+            for session_name in lease_session_names:
+                if session_name in pending:
+                    store.set_next_run(session_name, *pending[session_name])
+                await scheduler.cancel(session_name)
+                await tg_clients.discard(session_name)
+            await store.flush()
+
+        coordinator = LeaseCoordinator(SqliteLeaseStore(settings.LEASE_STORE), node_id=get_node_id(),
+                                       get_session_names=get_session_names, start=start_accounts,
+                                       stop=stop_accounts, is_busy=scheduler.is_running)
+    else:
+        schedule_restored(scheduler, store, make_tapper, session_names)
+
+    reporter = asyncio.create_task(report_summaries(scheduler, report)) if report else None
+    fleet_summary = asyncio.create_task(log_fleet_summaries(scheduler)) if settings.LOG_AGGREGATE else None
+    reloader = None
+    if hot_reload and settings.HOT_RELOAD:
+        reloader = asyncio.create_task(reload_on_changes(scheduler, proxy_pool, http_pool, tg_clients, make_tapper,
+                                                         session_names, manage_sessions=coordinator is None))
+    coordinator_task = asyncio.create_task(coordinator.run()) if coordinator is not None else None
+
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    signals = []
+
+    def request_stop(signum: int) -> None:
+        stop_requested.set()
+        if signum == signal.SIGINT and signum in signals:
+            # A second Ctrl+C interrupts right away
+            loop.remove_signal_handler(signum)
+            signals.remove(signum)
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, request_stop, signum)
+            signals.append(signum)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    # Leases and hot reload can bring accounts back, so the fleet waits for them even when empty
+    runner = asyncio.create_task(scheduler.run(keep_alive=coordinator is not None or reloader is not None))
+    stopper = asyncio.create_task(stop_requested.wait())
+    try:
+        await asyncio.wait({runner, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        if stop_requested.is_set():
+            logger.info("Shutting down, press Ctrl+C again to stop right away")
+            runner.cancel()
+            await scheduler.drain(settings.SHUTDOWN_TIMEOUT)
+        else:
+            runner.result()
+    finally:
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+        runner.cancel()
+        stopper.cancel()
+        if reloader is not None:
+            reloader.cancel()
+        if coordinator_task is not None:
+            coordinator_task.cancel()
+        if reporter is not None:
+            reporter.cancel()
+        if fleet_summary is not None:
+            fleet_summary.cancel()
+        if loop_lag_monitor is not None:
+            loop_lag_monitor.cancel()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await scheduler.drain(0)
+        for session_name, (action, due) in scheduler.pending().items():
+            store.set_next_run(session_name, action, due)
+        await scheduler.close()
+        await tg_clients.close()
+        await proxy_pool.close()
+        await http_pool.close()
+        await store.close()
+        if coordinator is not None:
+            await coordinator.close()
+        if recorder is not None:
+            recorder.close()
+        profiler.stop()
+
+        if report is not None:
+            report(scheduler.summary())
@@ -1,10 +1,66 @@
+import json
+import random
+import re
 import sys
 from loguru import logger
 
+from bot.config import settings
+
+
+TEXT_FORMAT = ("<light-white>{time:YYYY-MM-DD HH:mm:ss}</light-white>"
+               " | <level>{level: <8}</level>"
+               " | <cyan><b>{line}</b></cyan>"
+               " - <light-white><b>{message}</b></light-white>")
+
+SESSION_PREFIX = re.compile(r'^(\S+) \| ')
+ERROR_TYPE = re.compile(r'^(?:\S+ \| )?([^:|]+)')
+
+error_counts: dict[str, int] = {}
+
+
+def add_session(record) -> None:
+    if 'session' not in record['extra']:
+        match = SESSION_PREFIX.match(record['message'])
+        if match:
+            record['extra']['session'] = match.group(1)
+
+
+def format_json(record) -> str:
+    entry = {
+        'time': record['time'].isoformat(),
+        'level': record['level'].name,
+        'line': record['line'],
+        'message': record['message'],
+        **{key: value for key, value in record['extra'].items() if key != 'json'},
+    }
+    if record['exception'] is not None:
+        entry['exception'] = repr(record['exception'].value)
+
+    record['extra']['json'] = json.dumps(entry, ensure_ascii=False, default=str)
+    return "{extra[json]}\n"
+
+
+def aggregate_filter(record) -> bool:
+    """Count errors for the fleet summary and keep only a sample of per-account lines."""
+    if record['level'].no >= logger.level('ERROR').no:
+        match = ERROR_TYPE.match(record['message'])
+        error_type = match.group(1).strip() if match else 'Unknown'
+        error_counts[error_type] = error_counts.get(error_type, 0) + 1
+        return True
+
+    if ('session' in record['extra'] and record['level'].no < logger.level('WARNING').no
+            and logger.level(settings.LOG_LEVEL.upper()).no > logger.level('DEBUG').no):
+        return random.random() < settings.LOG_SAMPLE_RATE
+
+    return True
+
 
 logger.remove()
-logger.add(sink=sys.stdout, format="<light-white>{time:YYYY-MM-DD HH:mm:ss}</light-white>"
-                                   " | <level>{level: <8}</level>"
-                                   " | <cyan><b>{line}</b></cyan>"
-                                   " - <light-white><b>{message}</b></light-white>")
+logger.configure(patcher=add_session)
+logger.add(sink=sys.stdout,
+           level=settings.LOG_LEVEL.upper(),
+           format=format_json if settings.LOG_FORMAT == 'json' else TEXT_FORMAT,
+           colorize=None if settings.LOG_FORMAT != 'json' else False,
+           filter=aggregate_filter if settings.LOG_AGGREGATE else None,
+           enqueue=settings.LOG_ASYNC)
 logger = logger.opt(colors=True)
@@ -0,0 +1,149 @@
+import asyncio
+import math
+
+from aiohttp import web
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0}
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(labelname, '')) for labelname in self.labelnames)
+
+    def _format_labels(self, key: tuple[str, ...], extra: dict | None = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+    def values(self) -> dict[tuple[str, ...], float]:
+        return dict(self._values)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self.samples()]
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + value
+
+    def dec(self, value: float = 1, **labels) -> None:
+        self.inc(-value, **labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*buckets, math.inf)
+        self._histograms: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram[0][index] += 1
+                break
+        histogram[1] += value
+        histogram[2] += 1
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (bucket_counts, total, count) in self._histograms.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == math.inf else str(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+request_duration = Histogram('snapster_request_duration_seconds', "API request latency", ('endpoint',))
+requests_total = Counter('snapster_requests_total', "API requests by endpoint and result",
+                         ('endpoint', 'result', 'status'))
+in_flight_requests = Gauge('snapster_in_flight_requests', "API requests currently in flight")
+cycles_total = Counter('snapster_cycles_total', "Completed account cycles")
+claims_total = Counter('snapster_claims_total', "Successful claims by action", ('action',))
+points_claimed_total = Counter('snapster_points_claimed_total', "Points claimed by action", ('action',))
+active_accounts = Gauge('snapster_active_accounts', "Accounts currently scheduled")
+flood_wait_seconds_total = Counter('snapster_flood_wait_seconds_total', "Seconds spent in Telegram FloodWait")
+event_loop_lag = Gauge('snapster_event_loop_lag_seconds', "Event loop lag measured by a periodic timer")
+healthy_proxies = Gauge('snapster_healthy_proxies', "Proxies currently passing health checks")
+steps_skipped_total = Counter('snapster_steps_skipped_total', "Cycle steps skipped as nothing was to be done",
+                              ('step',))
+tg_connections = Gauge('snapster_tg_connections', "Connected Telegram (MTProto) clients")
+timeouts_total = Counter('snapster_timeouts_total', "Timed out HTTP requests, Telegram calls and cycle steps",
+                         ('kind',))
+auth_states = Gauge('snapster_auth_states', "Accounts by authorization state", ('state',))
+
+METRICS = (request_duration, requests_total, in_flight_requests, cycles_total, claims_total, points_claimed_total,
+           active_accounts, flood_wait_seconds_total, event_loop_lag, healthy_proxies,
+           steps_skipped_total, tg_connections, timeouts_total, auth_states)
+
+
+def endpoint_label(endpoint: str | None) -> str:
+    return (endpoint or '').split('?', 1)[0]
+
+
+def render_metrics() -> str:
+    return '\n'.join(metric.render() for metric in METRICS) + '\n'
+
+
+async def monitor_event_loop_lag(interval: float = 1) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.set(max(loop.time() - start - interval, 0))
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type='text/plain; version=0.0.4')
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    return runner
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+from bot.utils import logger
+
+
+NO_SPAN = nullcontext()
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread every ``interval`` sec into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class SlowCallbackHandler(logging.Handler):
+    """Collects the "Executing <handle> took N seconds" warnings of asyncio debug mode."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.callbacks: list[tuple[float, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.msg.startswith('Executing') and len(record.args or ()) == 2:
+            handle, duration = record.args
+            self.callbacks.append((duration, str(handle)))
+
+
+def get_callback_name(handle: str) -> str:
+    match = re.search(r"coro=<([\w.<>]+)\(", handle) or re.search(r"<(?:Handle|TimerHandle) ([\w.<>]+)\(", handle)
+    return match.group(1) if match else handle.split('(', 1)[0]
+
+
+class Profiler:
+    """Opt-in profiling of a run (``main.py --profile``).
+
+    Writes timing spans of account steps, a sampled CPU profile in collapsed-stack format
+    (for flamegraph.pl or speedscope) and the slow callbacks reported by asyncio debug mode.
+    While disabled ``span`` returns a shared no-op context and steps are not timed at all.
+    """
+
+    SAMPLE_INTERVAL = 0.005
+    SLOW_CALLBACK_DURATION = 0.05
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.spans: dict[str, list[float]] = defaultdict(list)
+        self._sampler: StackSampler | None = None
+        self._slow_callbacks: SlowCallbackHandler | None = None
+        self._started_at = 0
+
+    def start(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.SLOW_CALLBACK_DURATION
+        self._slow_callbacks = SlowCallbackHandler()
+        logging.getLogger('asyncio').addHandler(self._slow_callbacks)
+
+        self._sampler = StackSampler(threading.get_ident(), self.SAMPLE_INTERVAL)
+        self._sampler.start()
+        self._started_at = time.perf_counter()
+        self.enabled = True
+        logger.info(f"Profiling to {directory}")
+
+    def record(self, name: str, duration: float) -> None:
+        self.spans[name].append(duration)
+
+    def span(self, name: str):
+        return self._span(name) if self.enabled else NO_SPAN
+
+    @contextmanager
+    def _span(self, name: str):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name].append(time.perf_counter() - started_at)
+
+    def stop(self) -> None:
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        elapsed = time.perf_counter() - self._started_at
+        self._sampler.stop()
+        logging.getLogger('asyncio').removeHandler(self._slow_callbacks)
+
+        self.write_spans(os.path.join(self.directory, "spans.txt"), elapsed)
+        self.write_stacks(os.path.join(self.directory, "cpu.collapsed"))
+        self.write_slow_callbacks(os.path.join(self.directory, "slow_callbacks.txt"))
+        logger.info(f"Profile saved to {self.directory} | spans.txt, cpu.collapsed, slow_callbacks.txt")
+
+    def write_spans(self, file_name: str, elapsed: float) -> None:
+        with open(file_name, 'w', encoding='utf-8') as file:
+            file.write(f"Profiled for {elapsed:.1f}s\n\n")
+            file.write(f"{'span':<10} {'count':>8} {'total, s':>10} {'mean, ms':>10} {'p50, ms':>10} "
+                       f"{'p95, ms':>10} {'max, ms':>10}\n")
+            for name, durations in sorted(self.spans.items(), key=lambda item: -sum(item[1])):
+                cut_points = statistics.quantiles(durations, n=20, method='inclusive') \
+                    if len(durations) > 1 else durations * 19
+                file.write(f"{name:<10} {len(durations):>8} {sum(durations):>10.2f} "
+                           f"{statistics.fmean(durations) * 1000:>10.1f} {statistics.median(durations) * 1000:>10.1f} "
+                           f"{cut_points[18] * 1000:>10.1f} {max(durations) * 1000:>10.1f}\n")
+
+    def write_stacks(self, file_name: str) -> None:
+        with open(file_name, 'w', encoding='utf-8') as file:
+            for stack, count in self._sampler.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def write_slow_callbacks(self, file_name: str) -> None:
+        callbacks = self._slow_callbacks.callbacks
+        totals = defaultdict(list)
+        for duration, handle in callbacks:
+            totals[get_callback_name(handle)].append(duration)
+
+        with open(file_name, 'w', encoding='utf-8') as file:
+            file.write(f"{len(callbacks)} callbacks blocked the event loop for more than "
+                       f"{self.SLOW_CALLBACK_DURATION * 1000:.0f} ms\n\n")
+            for name, durations in sorted(totals.items(), key=lambda item: -sum(item[1])):
+                file.write(f"{sum(durations):>8.3f}s  {len(durations):>6}x  max {max(durations):.3f}s  {name}\n")
+
+            file.write("\nSlowest:\n")
+            for duration, handle in sorted(callbacks, reverse=True)[:50]:
+                file.write(f"{duration:>8.3f}s  {handle}\n")
+
+
+profiler = Profiler()
@@ -0,0 +1,134 @@
+import asyncio
+import csv
+import json
+import time
+from dataclasses import asdict
+
+from bot.config import settings
+from bot.utils import logger
+from bot.exceptions import InvalidSession, InvalidTgWebData
+from bot.core.tapper import Tapper
+from bot.core.http_pool import HttpClientPool
+from bot.core.proxy_pool import ProxyPool
+from bot.core.state_store import StateStore
+from bot.core.quests import QuestCatalogue
+from bot.core.tg_clients import TgClientManager
+
+
+SWEEP_FIELDS = (
+    'session_name', 'user_id', 'points', 'daily_streak', 'league', 'mining_speed',
+    'ref_points', 'quests_completed', 'quests_available', 'error',
+)
+
+
+class SweepWriter:
+    """Writes status rows to CSV or, for ``.jsonl`` files, JSON lines as soon as they arrive."""
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.file = open(file_name, 'w', newline='', encoding='utf-8')
+        self.csv_writer = None
+        if not file_name.endswith(('.jsonl', '.json')):
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=SWEEP_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, row: dict) -> None:
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def get_status(tapper: Tapper, quest_catalogue: QuestCatalogue) -> dict:
+    """Collect the account's status with GET requests only, re-authorizing once if the cached auth is rejected."""
+    row = {'session_name': tapper.session_name}
+
+    for attempt in range(2):
+        try:
+            if 'farm' not in await tapper.login():
+                row['error'] = "Authorization failed"
+                return row
+
+            stats = await tapper.api.get_user_by_telegram_id(tapper.http_client, tapper.user_id)
+            ref_points = await tapper.api.calculate_referral_points(tapper.http_client, tapper.user_id)
+            quests = await quest_catalogue.get(lambda: tapper.get_quests(tapper.http_client))
+            break
+        except InvalidTgWebData:
+            tapper.store.invalidate_tg_web_data(tapper.session_name)
+            tapper.tg_web_data = None
+            if attempt:
+                row['error'] = "Web app data rejected"
+                return row
+        except InvalidSession:
+            row['error'] = "Invalid session"
+            return row
+        except Exception as error:
+            row['error'] = str(error) or type(error).__name__
+            return row
+
+    completed_quests = tapper.store.get_completed_quests(tapper.session_name)
+    tapper.store.update(tapper.session_name, last_stats=asdict(stats))
+
+    row.update(
+        user_id=tapper.user_id,
+        points=stats.points,
+        daily_streak=stats.daily_streak,
+        league=stats.league.title,
+        mining_speed=stats.league.mining_speed,
+        ref_points=ref_points,
+        quests_completed=len(completed_quests),
+        quests_available=sum(quest.id not in completed_quests for quest in quests),
+    )
+    return row
+
+
+async def run_sweep(session_names: list[str], proxies: list[str], output: str) -> None:
+    """Read-only status of every session, ``SWEEP_CONCURRENCY`` accounts at a time."""
+    from bot.utils.launcher import make_tg_client
+
+    http_pool = HttpClientPool()
+    store = StateStore()
+    await store.start()
+    quest_catalogue = QuestCatalogue()
+    proxy_pool = ProxyPool(proxies, http_pool=http_pool, store=store)
+    await proxy_pool.start()
+    tg_clients = TgClientManager(make_tg_client)
+    tg_clients.start()
+    writer = SweepWriter(output)
+    semaphore = asyncio.Semaphore(max(settings.SWEEP_CONCURRENCY, 1))
+
+    async def sweep(session_name: str) -> dict:
+        async with semaphore:
+            tapper = Tapper(session_name, tg_clients=tg_clients, http_pool=http_pool, store=store,
+                            quest_catalogue=quest_catalogue, proxy_pool=proxy_pool, read_only=True)
+            try:
+                return await get_status(tapper, quest_catalogue)
+            finally:
+                await tapper.close()
+
+    logger.info(f"Sweeping {len(session_names)} sessions to {output}")
+    started_at = time.time()
+    total_points = 0
+    errors = 0
+
+    try:
+        for task in asyncio.as_completed([sweep(session_name) for session_name in session_names]):
+            row = await task
+            writer.write(row)
+            if row.get('error'):
+                errors += 1
+            else:
+                total_points += row['points']
+    finally:
+        writer.close()
+        await tg_clients.close()
+        await proxy_pool.close()
+        await http_pool.close()
+        await store.close()
+
+    logger.info(f"Sweep done in {time.time() - started_at:.1f}s | Sessions: <lc>{len(session_names)}</lc>, "
+                f"errors: <lr>{errors}</lr>, total points: <lc>{total_points:g}</lc>")
@@ -0,0 +1,171 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import Connection
+
+from bot.config import settings
+from bot.utils import logger
+
+
+def split_accounts(session_names: list[str], proxies: list[str], workers: int,
+                   bound_proxies: dict[str, str]) -> list[tuple[list[str], list[str]]]:
+    """Split sessions and proxies into ``workers`` shards of ``(session_names, proxies)``.
+
+    Proxies are dealt out evenly and a session stays in the shard of the proxy it used
+    last; the rest go to the shard with the fewest sessions per proxy.
+    """
+    proxies = list(dict.fromkeys(proxies))
+    shards = [([], []) for _ in range(workers)]
+    proxy_shards = {}
+    for index, proxy in enumerate(proxies):
+        shards[index % workers][1].append(proxy)
+        proxy_shards[proxy] = index % workers
+
+    free_session_names = []
+    for session_name in session_names:
+        shard_index = proxy_shards.get(bound_proxies.get(session_name))
+        if shard_index is None:
+            free_session_names.append(session_name)
+        else:
+            shards[shard_index][0].append(session_name)
+
+    open_shards = [shard for shard in shards if shard[1]] if proxies else shards
+    for session_name in free_session_names:
+        min(open_shards, key=lambda shard: len(shard[0]) / max(len(shard[1]), 1))[0].append(session_name)
+
+    return shards
+
+
+def run_worker(index: int, session_names: list[str], proxies: list[str], workers: int,
+               connection: Connection, profile: str | None = None) -> None:
+    from bot.core.rate_limit import rate_limiter
+    from bot.utils.launcher import run_tasks
+
+    def request_shutdown(signum, frame):
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+
+    def report(summary: dict) -> None:
+        try:
+            connection.send({'worker': index, **summary})
+        except (OSError, ValueError):
+            pass
+
+    rate_limiter.set_share(1 / workers)
+    if settings.NODE_ID:
+        settings.NODE_ID = f"{settings.NODE_ID}-{index}"
+    if settings.HTTP_RECORD_FILE:
+        directory, file_name = os.path.split(settings.HTTP_RECORD_FILE)
+        stem, dot, extension = file_name.partition('.')
+        settings.HTTP_RECORD_FILE = os.path.join(directory, f"{stem}-{index}{dot}{extension}")
+    metrics_port = settings.METRICS_PORT + 1 + index if settings.METRICS_PORT else 0
+
+    try:
+        asyncio.run(run_tasks(session_names=session_names, proxies=proxies, report=report,
+                              metrics_port=metrics_port, hot_reload=False,
+                              profile=os.path.join(profile, f"worker-{index}") if profile else None))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        connection.close()
+
+
+def log_summary(summary: dict) -> None:
+    logger.info(f"Worker {summary['worker']} | Accounts: <lc>{summary.get('accounts', 0)}</lc>, "
+                f"in flight: <lc>{summary.get('in_flight', 0)}</lc>, actions: <lc>{summary.get('actions', 0)}</lc>, "
+                f"errors: <lc>{summary.get('errors', 0)}</lc>, "
+                f"invalid sessions: <lc>{summary.get('invalid_sessions', 0)}</lc>")
+
+
+async def run_workers(session_names: list[str], proxies: list[str], workers: int, profile: str | None = None) -> None:
+    """Run the sessions in ``workers`` processes, restarting any worker that crashes."""
+    from bot.core.state_store import StateStore
+
+    store = StateStore()
+    store.open()
+    bound_proxies = {session_name: store.get(session_name).get('proxy') for session_name in session_names}
+    await store.close()
+
+    context = multiprocessing.get_context('spawn')
+    shards = split_accounts(session_names, proxies, workers, bound_proxies)
+    if settings.LEASE_STORE:
+        # Every worker is a node of its own and claims accounts from all sessions
+        shards = [(session_names, shard_proxies) for _, shard_proxies in shards]
+    running: dict[int, tuple[multiprocessing.Process, Connection]] = {}
+    restarts: dict[int, float] = {}
+
+    def start_worker(index: int) -> None:
+        receiver, sender = context.Pipe(duplex=False)
+        shard_session_names, shard_proxies = shards[index]
+        process = context.Process(target=run_worker,
+                                  args=(index, shard_session_names, shard_proxies, workers, sender, profile),
+                                  name=f"worker-{index}")
+        process.start()
+        sender.close()
+        running[index] = (process, receiver)
+        logger.info(f"Worker {index} started with {len(shard_session_names)} sessions | "
+                    f"{len(shard_proxies)} proxies")
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+
+    for index, (shard_session_names, _) in enumerate(shards):
+        if shard_session_names:
+            start_worker(index)
+
+    try:
+        while running or restarts:
+            await asyncio.sleep(1)
+
+            for index, (process, receiver) in list(running.items()):
+                try:
+                    while receiver.poll():
+                        log_summary(receiver.recv())
+                except (EOFError, OSError):
+                    pass
+
+                if process.is_alive():
+                    continue
+
+                receiver.close()
+                del running[index]
+                if process.exitcode != 0:
+                    logger.warning(f"Worker {index} exited with code {process.exitcode}, "
+                                   f"restarting in {settings.WORKER_RESTART_DELAY}s")
+                    restarts[index] = time.time() + settings.WORKER_RESTART_DELAY
+
+            for index, restart_at in list(restarts.items()):
+                if restart_at <= time.time():
+                    del restarts[index]
+                    start_worker(index)
+
+    finally:
+        for process, _ in running.values():
+            if process.is_alive():
+                process.terminate()
+
+        def join_workers() -> None:
+            deadline = time.time() + settings.WORKER_SHUTDOWN_TIMEOUT
+            for process, _ in running.values():
+                process.join(timeout=max(deadline - time.time(), 0))
+                if process.is_alive():
+                    process.kill()
+
+        await asyncio.to_thread(join_workers)
+
+        for index, (process, receiver) in running.items():
+            try:
+                while receiver.poll():
+                    log_summary(receiver.recv())
+            except (EOFError, OSError):
+                pass
+            receiver.close()
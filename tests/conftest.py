@@ -0,0 +1,8 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('API_ID', '1')
+os.environ.setdefault('API_HASH', 'test')
+
+import bot.utils  # noqa: E402,F401  bot.core modules expect bot.utils to be imported first
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from bot.config import settings
+from bot.core.leases import LeaseCoordinator, SqliteLeaseStore
+from tests.utils import wait_until
+
+
+SESSION_NAMES = [f"session{index}" for index in range(10)]
+
+
+@pytest.fixture(autouse=True)
+def fast_leases(monkeypatch):
+    monkeypatch.setattr(settings, 'LEASE_TTL', 1)
+    monkeypatch.setattr(settings, 'LEASE_RENEW_INTERVAL', 0.2)
+
+
+class Fleet:
+    """Fake nodes sharing one lease file.
+
+    Fails when an account starts on a node while another node still runs it, or before
+    the lease of a crashed node has expired.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.running: dict[str, str] = {}
+        self.expires_at: dict[str, float] = {}
+
+    def make_node(self, node_id: str) -> LeaseCoordinator:
+        async def start(session_names: list[str]) -> None:
+            for session_name in session_names:
+                assert session_name not in self.running, f"{session_name} runs on {self.running[session_name]}"
+                assert time.time() >= self.expires_at.get(session_name, 0), f"{session_name} lease taken early"
+                self.running[session_name] = node_id
+
+        async def stop(session_names: list[str]) -> None:
+            for session_name in session_names:
+                if self.running.get(session_name) == node_id:
+                    del self.running[session_name]
+
+        return LeaseCoordinator(SqliteLeaseStore(self.file_name), node_id, lambda: SESSION_NAMES,
+                                start, stop, is_busy=lambda session_name: False)
+
+    def crash(self, node: LeaseCoordinator, task: asyncio.Task) -> None:
+        """Kill the node without releasing its leases; they stay valid for LEASE_TTL after the last renewal."""
+        task.cancel()
+        for session_name in node.held:
+            # renew() runs just before renewed_at is set, so allow for the time between them
+            self.expires_at[session_name] = node.renewed_at + settings.LEASE_TTL - 0.1
+            self.running.pop(session_name, None)
+
+
+def test_rebalance_on_join_and_handover_on_leave(tmp_path):
+    async def main():
+        fleet = Fleet(str(tmp_path / 'leases.db'))
+        a = fleet.make_node('a')
+        a_task = asyncio.create_task(a.run())
+        await wait_until(lambda: len(a.held) == 10)
+
+        b = fleet.make_node('b')
+        b_task = asyncio.create_task(b.run())
+        await wait_until(lambda: len(a.held) == 5 and len(b.held) == 5 and len(fleet.running) == 10)
+        assert not a.held & b.held
+
+        a_task.cancel()
+        await a.stop(sorted(a.held))
+        await a.close()
+        await wait_until(lambda: len(b.held) == 10 and len(fleet.running) == 10)
+
+        b_task.cancel()
+        await b.close()
+
+    asyncio.run(main())
+
+
+def test_failover_after_ttl(tmp_path):
+    async def main():
+        fleet = Fleet(str(tmp_path / 'leases.db'))
+        a = fleet.make_node('a')
+        b = fleet.make_node('b')
+        a_task = asyncio.create_task(a.run())
+        b_task = asyncio.create_task(b.run())
+        await wait_until(lambda: len(a.held) == 5 and len(b.held) == 5)
+
+        fleet.crash(a, a_task)
+        await wait_until(lambda: len(b.held) == 10 and len(fleet.running) == 10)
+
+        b_task.cancel()
+        await b.close()
+        await a.lease_store.close()
+
+    asyncio.run(main())
+
+
+def test_node_stops_accounts_when_leases_cannot_be_renewed(tmp_path, monkeypatch):
+    async def main():
+        fleet = Fleet(str(tmp_path / 'leases.db'))
+        a = fleet.make_node('a')
+        a_task = asyncio.create_task(a.run())
+        await wait_until(lambda: len(fleet.running) == 10)
+
+        async def unavailable(*args):
+            raise OSError("lease store unavailable")
+
+        monkeypatch.setattr(a.lease_store, 'heartbeat', unavailable)
+        await wait_until(lambda: not fleet.running)
+        assert time.time() - a.renewed_at >= settings.LEASE_TTL - settings.LEASE_RENEW_INTERVAL
+
+        a_task.cancel()
+        await a.lease_store.close()
+
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from bot.core.rate_limit import TokenBucket, get_retry_after
+
+
+def test_token_bucket_rate():
+    async def main():
+        bucket = TokenBucket(rate=50, capacity=1)
+        started_at = time.monotonic()
+        for _ in range(11):
+            await bucket.acquire()
+        return time.monotonic() - started_at
+
+    # The first token is there from the start, the next 10 come at 50 per second
+    assert 0.18 <= asyncio.run(main()) < 2
+
+
+def test_token_bucket_burst():
+    async def main():
+        bucket = TokenBucket(rate=1, capacity=5)
+        started_at = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - started_at
+
+    assert asyncio.run(main()) < 0.5
+
+
+def test_retry_after_seconds():
+    assert get_retry_after('5') == 5
+    assert get_retry_after('1.5') == 1.5
+    assert get_retry_after('-3') == 0
+
+
+def test_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= get_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+    assert get_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+
+
+def test_retry_after_missing_or_invalid():
+    assert get_retry_after(None) is None
+    assert get_retry_after('') is None
+    assert get_retry_after('soon') is None
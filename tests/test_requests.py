@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+
+from bot.config import settings
+from bot.core import tapper as tapper_module
+from bot.core.state_store import StateStore
+from bot.core.tapper import Tapper
+from bot.exceptions import InvalidTgWebData
+from tests.utils import FakeHttpClient, FakeHttpPool, FakeResponse
+
+
+def connect_error() -> aiohttp.ClientConnectorError:
+    connection_key = SimpleNamespace(host='prod.snapster.bot', port=443, ssl=None)
+    return aiohttp.ClientConnectorError(connection_key, OSError(111, "Connection refused"))
+
+
+@pytest.fixture
+def tapper(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'REQUEST_RETRIES', 2)
+    monkeypatch.setattr(settings, 'RETRY_BACKOFF', 0)
+    return Tapper('session', tg_clients=None, http_pool=FakeHttpPool(), store=StateStore(str(tmp_path / 'state.db')),
+                  quest_catalogue=None)
+
+
+def request(tapper: Tapper, http_client: FakeHttpClient, method: str, endpoint: str = 'user/claimMiningBonus'):
+    return asyncio.run(tapper.make_request(http_client, method, endpoint))
+
+
+def test_429_is_retried_and_pauses_the_proxy(tapper, monkeypatch):
+    pauses = []
+    monkeypatch.setattr(tapper_module.rate_limiter, 'pause', lambda proxy, delay: pauses.append((proxy, delay)))
+    http_client = FakeHttpClient(FakeResponse(429, {'Retry-After': '0.01'}), 200)
+
+    response = request(tapper, http_client, 'POST')
+
+    assert response.status == 200
+    assert len(http_client.requests) == 2
+    assert pauses == [(None, 0.01)]
+
+
+@pytest.mark.parametrize('method, attempts', [('GET', 3), ('POST', 1)])
+def test_5xx_is_retried_for_get_only(tapper, method, attempts):
+    http_client = FakeHttpClient(500, 502, 503)
+
+    response = request(tapper, http_client, method)
+
+    assert len(http_client.requests) == attempts
+    assert response.status >= 500
+
+
+def test_connect_error_is_retried_for_post(tapper):
+    http_client = FakeHttpClient(connect_error(), 200)
+
+    assert request(tapper, http_client, 'POST').status == 200
+    assert len(http_client.requests) == 2
+
+
+@pytest.mark.parametrize('error', [aiohttp.ServerDisconnectedError(), asyncio.TimeoutError()])
+def test_other_connection_errors_are_not_retried_for_post(tapper, error):
+    http_client = FakeHttpClient(error, 200)
+
+    with pytest.raises(type(error)):
+        request(tapper, http_client, 'POST')
+    assert len(http_client.requests) == 1
+
+
+@pytest.mark.parametrize('error', [aiohttp.ServerDisconnectedError(), asyncio.TimeoutError()])
+def test_other_connection_errors_are_retried_for_get(tapper, error):
+    http_client = FakeHttpClient(error, 200)
+
+    assert request(tapper, http_client, 'GET').status == 200
+    assert len(http_client.requests) == 2
+
+
+def test_rejected_web_data_releases_the_response(tapper):
+    response = FakeResponse(401)
+
+    with pytest.raises(InvalidTgWebData):
+        request(tapper, FakeHttpClient(response), 'GET')
+    assert response.released
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+from bot.core.scheduler import Scheduler
+from tests.utils import wait_until
+
+
+class FakeAccount:
+    def __init__(self, session_name: str, duration: float = 0, follow_up: float | None = 0.05):
+        self.session_name = session_name
+        self.duration = duration
+        self.follow_up = follow_up
+        self.dispatched = []
+        self.finished = 0
+        self.closed = False
+
+    async def dispatch(self, action: str) -> dict[str, float]:
+        self.dispatched.append(action)
+        await asyncio.sleep(self.duration)
+        self.finished += 1
+        return {action: time.time() + self.follow_up} if self.follow_up is not None else {}
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_run_returns_once_accounts_are_done():
+    async def main():
+        scheduler = Scheduler(max_in_flight=10)
+        accounts = [FakeAccount(f"session{index}", follow_up=None) for index in range(3)]
+        for account in accounts:
+            scheduler.add(account, 'farm')
+        await asyncio.wait_for(scheduler.run(), timeout=10)
+        return accounts
+
+    for account in asyncio.run(main()):
+        assert account.dispatched == ['farm']
+        assert account.closed
+
+
+def test_max_in_flight():
+    running = []
+    peak = []
+
+    class CountingAccount(FakeAccount):
+        async def dispatch(self, action: str) -> dict[str, float]:
+            running.append(self.session_name)
+            peak.append(len(running))
+            try:
+                return await super().dispatch(action)
+            finally:
+                running.remove(self.session_name)
+
+    async def main():
+        scheduler = Scheduler(max_in_flight=2)
+        accounts = [CountingAccount(f"session{index}", duration=0.02, follow_up=None) for index in range(6)]
+        for account in accounts:
+            scheduler.add(account, 'farm')
+        await asyncio.wait_for(scheduler.run(), timeout=10)
+        return accounts
+
+    accounts = asyncio.run(main())
+    assert all(account.finished == 1 for account in accounts)
+    assert max(peak) == 2
+
+
+def test_cancel_drops_running_action():
+    async def main():
+        scheduler = Scheduler(max_in_flight=10)
+        old = FakeAccount('a', duration=10)
+        scheduler.add(old, 'farm')
+        runner = asyncio.create_task(scheduler.run(keep_alive=True))
+        await wait_until(lambda: scheduler.is_running('a'))
+
+        await scheduler.cancel('a')
+        new = FakeAccount('a')
+        scheduler.add(new, 'farm')
+        await wait_until(lambda: new.finished >= 3)
+        runner.cancel()
+        await scheduler.close()
+        return old, new
+
+    old, new = asyncio.run(main())
+    assert old.dispatched == ['farm']
+    assert old.finished == 0
+    assert old.closed
+
+
+def test_cancel_clears_pending():
+    async def main():
+        scheduler = Scheduler(max_in_flight=10)
+        scheduler.add(FakeAccount('a'), 'login', due=time.time() + 60)
+        await scheduler.cancel('a')
+        return scheduler.pending(), scheduler.summary()
+
+    pending, summary = asyncio.run(main())
+    assert pending == {}
+    assert summary['accounts'] == 0
+
+
+def test_drain_requeues_interrupted_action():
+    async def main():
+        scheduler = Scheduler(max_in_flight=10)
+        scheduler.add(FakeAccount('a', duration=10), 'farm')
+        scheduler.add(FakeAccount('b'), 'login', due=time.time() + 60)
+        runner = asyncio.create_task(scheduler.run(keep_alive=True))
+        await wait_until(lambda: scheduler.is_running('a'))
+        runner.cancel()
+        await scheduler.drain(0)
+        pending = scheduler.pending()
+        await scheduler.close()
+        return pending
+
+    pending = asyncio.run(main())
+    assert pending['a'][0] == 'farm'
+    assert pending['a'][1] <= time.time()
+    assert pending['b'][0] == 'login'
+
+
+def test_drain_waits_for_running_actions():
+    async def main():
+        scheduler = Scheduler(max_in_flight=10)
+        account = FakeAccount('a', duration=0.1, follow_up=60)
+        scheduler.add(account, 'farm')
+        runner = asyncio.create_task(scheduler.run(keep_alive=True))
+        await wait_until(lambda: scheduler.is_running('a'))
+        runner.cancel()
+        await scheduler.drain(10)
+        pending = scheduler.pending()
+        await scheduler.close()
+        return account, pending
+
+    account, pending = asyncio.run(main())
+    assert account.finished == 1
+    assert pending['a'][1] > time.time() + 30
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+from bot.core.state_store import StateStore
+from tests.utils import wait_until
+
+
+def slow_down_writes(store: StateStore, monkeypatch) -> threading.Event:
+    """Make every write take a while; the returned event is set once a write has started."""
+    started = threading.Event()
+    write = store._write
+
+    def slow_write(*args):
+        started.set()
+        time.sleep(0.3)
+        write(*args)
+
+    monkeypatch.setattr(store, '_write', slow_write)
+    return started
+
+
+async def reopen(file_name: str) -> StateStore:
+    store = StateStore(file_name)
+    await store.start()
+    return store
+
+
+def test_close_keeps_changes_of_an_interrupted_flush(tmp_path, monkeypatch):
+    file_name = str(tmp_path / 'state.db')
+
+    async def main():
+        store = await reopen(file_name)
+        write_started = slow_down_writes(store, monkeypatch)
+        store.update('a', user_agent='first')
+        flush = asyncio.create_task(store.flush())
+        await wait_until(write_started.is_set)
+        flush.cancel()
+        store.update('b', user_agent='second')
+        await asyncio.gather(flush, return_exceptions=True)
+        await store.close()
+
+        store = await reopen(file_name)
+        accounts = store.get('a'), store.get('b')
+        await store.close()
+        return accounts
+
+    a, b = asyncio.run(main())
+    assert a['user_agent'] == 'first'
+    assert b['user_agent'] == 'second'
+
+
+def test_close_waits_for_periodic_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr('bot.config.settings.STATE_FLUSH_INTERVAL', 0)
+    file_name = str(tmp_path / 'state.db')
+
+    async def main():
+        store = await reopen(file_name)
+        write_started = slow_down_writes(store, monkeypatch)
+        store.update('a', user_agent='x')
+        await wait_until(write_started.is_set)
+        await store.close()
+
+        store = await reopen(file_name)
+        account = store.get('a')
+        await store.close()
+        return account
+
+    assert asyncio.run(main())['user_agent'] == 'x'
+
+
+def test_next_run_and_parked_quests_survive_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr('bot.config.settings.QUEST_MAX_ATTEMPTS', 2)
+    file_name = str(tmp_path / 'state.db')
+
+    async def main():
+        store = await reopen(file_name)
+        store.set_next_run('a', 'farm', 123.0)
+        parked = [store.record_quest_failure('a', 7), store.record_quest_failure('a', 7)]
+        await store.close()
+
+        store = await reopen(file_name)
+        result = parked, store.get_next_run('a'), store.is_quest_parked('a', 7), store.get_completed_quests('a')
+        await store.close()
+        return result
+
+    parked, next_run, is_parked, completed = asyncio.run(main())
+    assert parked == [False, True]
+    assert next_run == ('farm', 123.0)
+    assert is_parked
+    assert completed == set()
+
+
+def test_imports_user_agents_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'user_agents.json').write_text('[{"session_name": "a", "user_agent": "UA"}]')
+
+    async def main():
+        store = await reopen('state.db')
+        store.update('a', user_agent='changed')
+        await store.close()
+
+        store = await reopen('state.db')
+        account = store.get('a')
+        await store.close()
+        return account
+
+    assert asyncio.run(main())['user_agent'] == 'changed'
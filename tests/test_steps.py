@@ -0,0 +1,140 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from bot.config import settings
+from bot.core.models import UserStats
+from bot.core.state_store import StateStore
+from bot.core.tapper import Tapper
+from tests.utils import FakeHttpClient, FakeHttpPool, FakeResponse
+
+
+STEPS = ('stats', 'streak', 'daily', 'mining', 'refs')
+
+
+@pytest.fixture(autouse=True)
+def step_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'REQUEST_RETRIES', 0)
+    monkeypatch.setattr(settings, 'SKIP_DONE_STEPS', True)
+    monkeypatch.setattr(settings, 'AUTO_MINING', True)
+    monkeypatch.setattr(settings, 'CLAIM_REF_POINTS', True)
+    monkeypatch.setattr(settings, 'AUTO_QUEST', False)
+    monkeypatch.setattr(settings, 'MINING_CLAIM_THRESHOLD', 100)
+    monkeypatch.setattr(settings, 'REFS_CHECK_INTERVAL', 3600)
+
+
+def make_tapper(tmp_path, http_client: FakeHttpClient | None = None) -> Tapper:
+    tapper = Tapper('session', tg_clients=None, http_pool=FakeHttpPool(http_client),
+                    store=StateStore(str(tmp_path / 'state.db')), quest_catalogue=None)
+    tapper.user_id = 1
+    return tapper
+
+
+def get_midnight() -> float:
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def run_farm(tapper: Tapper) -> list[str]:
+    """Steps the farm cycle runs, with every step replaced by a recorder."""
+    ran = []
+
+    def record(step: str):
+        async def run(results: dict) -> None:
+            ran.append(step)
+        return run
+
+    for step in STEPS:
+        setattr(tapper, f'step_{step}', record(step))
+
+    asyncio.run(tapper.farm())
+    return sorted(ran)
+
+
+@pytest.mark.parametrize('status', [400, 500])
+@pytest.mark.parametrize('step', ['streak', 'daily', 'mining'])
+def test_error_response_does_not_mark_step_done(tmp_path, step, status):
+    http_client = FakeHttpClient(FakeResponse(status, body=b'{"result": false}'))
+    tapper = make_tapper(tmp_path, http_client)
+
+    results = {'stats': UserStats(daily_streak=3)}
+    asyncio.run(getattr(tapper, f'step_{step}')(results))
+
+    assert len(http_client.requests) == 1
+    assert tapper.store.get_claimed_at('session', step) is None
+
+
+@pytest.mark.parametrize('step', ['streak', 'daily', 'mining'])
+def test_accepted_response_marks_step_done(tmp_path, step):
+    body = b'{"result": true, "data": {"pointsClaimed": 10}}'
+    tapper = make_tapper(tmp_path, FakeHttpClient(FakeResponse(200, body=body)))
+
+    asyncio.run(getattr(tapper, f'step_{step}')({'stats': UserStats(daily_streak=3)}))
+
+    assert tapper.store.get_claimed_at('session', step) is not None
+
+
+def test_is_done_today(tmp_path):
+    tapper = make_tapper(tmp_path)
+    assert not tapper.is_done_today('daily')
+
+    tapper.store.set_claimed_at('session', 'daily', get_midnight() - 1)
+    assert not tapper.is_done_today('daily')
+
+    tapper.store.set_claimed_at('session', 'daily', get_midnight() + 1)
+    assert tapper.is_done_today('daily')
+
+
+def test_is_done_within(tmp_path):
+    tapper = make_tapper(tmp_path)
+    assert not tapper.is_done_within('refs', 3600)
+
+    tapper.store.set_claimed_at('session', 'refs', time.time() - 3500)
+    assert tapper.is_done_within('refs', 3600)
+    assert not tapper.is_done_within('refs', 3000)
+
+
+def test_get_mining_accrued(tmp_path):
+    tapper = make_tapper(tmp_path)
+    assert tapper.get_mining_accrued() is None
+
+    tapper.store.set_claimed_at('session', 'mining', time.time() - 600)
+    assert tapper.get_mining_accrued() is None
+
+    tapper.store.update('session', last_stats={'league': {'mining_speed': 2}})
+    assert tapper.get_mining_accrued() == pytest.approx(20, abs=0.1)
+
+
+def test_farm_runs_every_step_without_history(tmp_path):
+    assert run_farm(make_tapper(tmp_path)) == sorted(STEPS)
+
+
+def test_farm_skips_steps_done_recently(tmp_path):
+    tapper = make_tapper(tmp_path)
+    store = tapper.store
+    store.set_claimed_at('session', 'streak', get_midnight() + 1)
+    store.set_claimed_at('session', 'daily', get_midnight() - 1)
+    store.set_claimed_at('session', 'mining', time.time() - 600)
+    store.update('session', last_stats={'league': {'mining_speed': 1}})
+    store.set_claimed_at('session', 'refs', time.time() - 60)
+
+    # Daily was claimed yesterday and only 10 of 100 points were mined
+    assert run_farm(tapper) == ['daily', 'stats']
+
+
+def test_farm_claims_mining_above_threshold(tmp_path):
+    tapper = make_tapper(tmp_path)
+    tapper.store.set_claimed_at('session', 'mining', time.time() - 600)
+    tapper.store.update('session', last_stats={'league': {'mining_speed': 20}})
+
+    assert 'mining' in run_farm(tapper)
+
+
+def test_farm_runs_every_step_with_skipping_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'SKIP_DONE_STEPS', False)
+    tapper = make_tapper(tmp_path)
+    for step in ('streak', 'daily', 'mining', 'refs'):
+        tapper.store.set_claimed_at('session', step)
+
+    assert run_farm(tapper) == sorted(STEPS)
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Callable
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float = 10, interval: float = 0.01) -> None:
+    """Poll ``condition`` until it holds, failing after ``timeout`` sec."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError(f"Condition was not met in {timeout}s")
+        await asyncio.sleep(interval)
+
+
+class FakeResponse:
+    def __init__(self, status: int, headers: dict | None = None, body: bytes = b'{}'):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+        self.released = False
+
+    async def read(self) -> bytes:
+        return self.body
+
+    def release(self) -> None:
+        self.released = True
+
+
+class FakeHttpClient:
+    """Answers requests with the given statuses or raises the given errors, in order."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    async def request(self, method: str, url: str, **kwargs) -> FakeResponse:
+        self.requests.append((method, url))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome if isinstance(outcome, FakeResponse) else FakeResponse(outcome)
+
+
+class FakeHttpPool:
+    def __init__(self, http_client: FakeHttpClient | None = None):
+        self.http_client = http_client
+
+    def get(self, proxy: str | None) -> FakeHttpClient | None:
+        return self.http_client